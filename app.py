@@ -6,14 +6,17 @@ Web应用服务器
 """
 
 import os
+import re
 import sys
 import json
 import webbrowser
 import http.server
+import socket
 import socketserver
 import threading
 import tempfile
 import shutil
+import atexit
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs, unquote
 from io import BytesIO
@@ -23,14 +26,114 @@ from email.parser import BytesParser
 
 from modules import ExcelPriceUpdater, BrowserIDReplacer, ExcelSplitter
 
+try:
+    import orjson
+except ImportError:  # orjson为可选加速依赖，缺失时退回标准库json
+    orjson = None
+
+
+# 预编译的Content-Disposition解析正则：一次匹配提取字段名和文件名
+_CD_RE = re.compile(
+    r'Content-Disposition:[^\r\n]*?\sname="([^"]*)"(?:;\s*filename="([^"]*)")?',
+    re.IGNORECASE
+)
+
+
+def _json_bytes(obj):
+    """将对象序列化为UTF-8 JSON字节串（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _json_loads(data):
+    """解析JSON字节串（优先使用orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# 内容固定的响应体在导入时序列化一次，请求路径上直接复用
+_SAVE_OK_BODY = _json_bytes({'success': True, 'message': '配置已保存'})
+
+
+def _default_temp_base():
+    """
+    选择临时目录的根路径
+
+    优先级：$EXCEL_UPDATER_TMPDIR > /dev/shm（Linux内存盘）> 系统临时目录。
+    上传→处理→下载的整个生命周期都在临时目录内，放到tmpfs可以
+    完全避开磁盘I/O。
+    """
+    env_dir = os.environ.get('EXCEL_UPDATER_TMPDIR')
+    if env_dir:
+        return Path(env_dir)
+    shm = '/dev/shm'
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return Path(shm)
+    return Path(tempfile.gettempdir())
+
 
 class WebAppHandler(http.server.SimpleHTTPRequestHandler):
     """Web应用HTTP处理器"""
-    
+
     config_file = Path("config.json")
-    temp_dir = Path(tempfile.gettempdir()) / "excel_updater"
+    temp_dir = _default_temp_base() / "excel_updater"
+    # 关闭Nagle算法：接口响应多为小JSON，攒包只会平添延迟
+    disable_nagle_algorithm = True
     browser_id_replacer = None  # BrowserID替换器实例
-    
+    _updater = None  # 共享的ExcelPriceUpdater实例
+    _updater_lock = threading.Lock()
+    _regions_bytes = None  # 预序列化的/api/regions响应
+    _config_cache = (None, None)  # ((mtime_ns, size), 序列化后的配置bytes)
+
+    @classmethod
+    def get_updater(cls):
+        """获取共享的ExcelPriceUpdater实例（懒加载，线程安全）"""
+        with cls._updater_lock:
+            if cls._updater is None:
+                cls._updater = ExcelPriceUpdater()
+            return cls._updater
+
+    @classmethod
+    def get_regions_bytes(cls):
+        """获取预序列化的地域列表响应字节（配置不变时直接复用）"""
+        if cls._regions_bytes is None:
+            regions = list(cls.get_updater().price_columns.keys())
+            cls._regions_bytes = _json_bytes({'regions': regions})
+        return cls._regions_bytes
+
+    _TEMP_DIR_LIMIT = 1 << 30  # 临时目录总大小上限（1GB）
+
+    @classmethod
+    def _evict_temp_dir(cls):
+        """临时目录超出大小上限时，从最旧的文件开始淘汰"""
+        try:
+            entries = []
+            for p in cls.temp_dir.iterdir():
+                if p.is_file():
+                    st = p.stat()
+                    entries.append((st.st_mtime, st.st_size, p))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= cls._TEMP_DIR_LIMIT:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+
+    @classmethod
+    def invalidate_updater(cls):
+        """配置变更后失效缓存的实例，下次请求时重建"""
+        with cls._updater_lock:
+            cls._updater = None
+            cls._regions_bytes = None
+            cls._config_cache = (None, None)
+
     def __init__(self, *args, **kwargs):
         # 确保临时目录存在
         self.temp_dir.mkdir(exist_ok=True)
@@ -63,6 +166,143 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
         # 静态文件
         super().do_GET()
     
+    def _parse_multipart_stream(self, dest_dir=None):
+        """
+        流式解析multipart/form-data请求体
+
+        以64KB为单位从rfile读取数据，边读边扫描boundary，
+        文件字段直接写入临时文件，小字段保留在内存中，
+        避免一次性缓冲整个请求体（峰值内存从O(文件大小)降到O(块大小)）。
+
+        Args:
+            dest_dir: 文件字段的保存目录，默认为self.temp_dir
+
+        Returns:
+            (files, fields)元组:
+                files: [(字段名, 原始文件名, 临时文件路径)] 列表
+                fields: {字段名: 字段内容bytes} 字典
+        """
+        content_type = self.headers.get('content-type', '')
+        if not content_type.startswith('multipart/form-data'):
+            raise ValueError('Invalid content type')
+
+        # 提取boundary
+        boundary = content_type.split('boundary=')[1].strip().encode('utf-8')
+        delimiter = b'--' + boundary
+
+        content_length = int(self.headers['Content-Length'])
+        remaining = content_length
+        chunk_size = 64 * 1024
+        buf = bytearray()
+
+        def fill():
+            """从rfile补充一块数据到缓冲区"""
+            nonlocal remaining
+            if remaining <= 0:
+                return False
+            data = self.rfile.read(min(chunk_size, remaining))
+            if not data:
+                remaining = 0
+                return False
+            remaining -= len(data)
+            buf.extend(data)
+            return True
+
+        files = []
+        fields = {}
+
+        # 定位第一个boundary
+        while buf.find(delimiter) == -1:
+            if not fill():
+                raise ValueError('Malformed multipart body')
+        del buf[:buf.find(delimiter) + len(delimiter)]
+
+        # 逐个解析part
+        while True:
+            # boundary之后是 '--'（结束）或 '\r\n'（新part）
+            while len(buf) < 2:
+                if not fill():
+                    self._evict_temp_dir()
+                    return files, fields
+            if buf[:2] == b'--':
+                self._evict_temp_dir()
+                return files, fields
+            del buf[:2]  # 跳过 '\r\n'
+
+            # 读取part头部（直到空行）
+            while buf.find(b'\r\n\r\n') == -1:
+                if not fill():
+                    raise ValueError('Malformed multipart headers')
+            header_end = buf.find(b'\r\n\r\n')
+            headers = bytes(buf[:header_end]).decode('utf-8', errors='replace')
+            del buf[:header_end + 4]
+
+            # 用预编译正则一次提取字段名和文件名
+            m = _CD_RE.search(headers)
+            name = m.group(1) if m else None
+            filename = m.group(2) if m else None
+
+            # 选择输出目标：文件字段写临时文件，小字段写内存
+            if filename:
+                # 唯一化临时文件名，避免并发上传同名文件相互覆盖；
+                # 保留原始文件名主干便于识别下载结果
+                src = Path(filename)
+                sink = tempfile.NamedTemporaryFile(
+                    dir=str(dest_dir or self.temp_dir),
+                    prefix=f"{src.stem}_", suffix=src.suffix,
+                    delete=False, buffering=1 << 20
+                )
+                temp_path = Path(sink.name)
+            else:
+                temp_path = None
+                sink = BytesIO()
+
+            # 流式写入body，直到下一个boundary
+            marker = b'\r\n' + delimiter
+            try:
+                while True:
+                    idx = buf.find(marker)
+                    if idx != -1:
+                        # memoryview切片零拷贝写出，避免bytearray切片复制
+                        with memoryview(buf) as mv:
+                            sink.write(mv[:idx])
+                        del buf[:idx + len(marker)]
+                        break
+                    # 保留末尾可能是不完整marker的部分，其余安全写出
+                    safe = len(buf) - len(marker)
+                    if safe > 0:
+                        with memoryview(buf) as mv:
+                            sink.write(mv[:safe])
+                        del buf[:safe]
+                    if not fill():
+                        raise ValueError('Unterminated multipart part')
+            finally:
+                if filename:
+                    sink.close()
+
+            if filename:
+                files.append((name, filename, temp_path))
+            elif name:
+                fields[name] = sink.getvalue()
+
+    def _send_json(self, status, body):
+        """
+        发送JSON响应
+
+        将状态行、响应头与正文合并为一次socket写出——wfile是无缓冲的，
+        分开写会产生多次系统调用（可能对应多个TCP段）。
+        """
+        if not isinstance(body, (bytes, bytearray)):
+            body = _json_bytes(body)
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        # 复用基类的头部缓冲，连同正文一次性写出
+        self._headers_buffer.append(b'\r\n')
+        self.wfile.write(b''.join(self._headers_buffer) + body)
+        self._headers_buffer = []
+
     def do_POST(self):
         """处理POST请求"""
         parsed_path = urlparse(self.path)
@@ -101,20 +341,23 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
     
     def handle_get_config(self):
         """获取配置"""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json; charset=utf-8')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         try:
             if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                self.wfile.write(json.dumps(config, ensure_ascii=False).encode('utf-8'))
+                # 以(mtime, size)为键缓存序列化结果，
+                # 配置未变时跳过重复的读盘+解析+序列化
+                st = os.stat(self.config_file)
+                key = (st.st_mtime_ns, st.st_size)
+                cached_key, cached_bytes = WebAppHandler._config_cache
+                if key != cached_key:
+                    with open(self.config_file, 'rb') as f:
+                        cached_bytes = _json_bytes(_json_loads(f.read()))
+                    WebAppHandler._config_cache = (key, cached_bytes)
+                body = cached_bytes
             else:
-                self.wfile.write(b'{}')
+                body = b'{}'
+            self._send_json(200, body)
         except Exception as e:
-            self.wfile.write(json.dumps({'error': str(e)}, ensure_ascii=False).encode('utf-8'))
+            self._send_json(500, _json_bytes({'error': str(e)}))
     
     def handle_save_config(self):
         """保存配置"""
@@ -122,108 +365,82 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
         post_data = self.rfile.read(content_length)
         
         try:
-            config = json.loads(post_data.decode('utf-8'))
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
-                'success': True,
-                'message': '配置已保存'
-            }, ensure_ascii=False).encode('utf-8'))
+            # 仅解析验证JSON格式，直接写入原始字节，
+            # 避免parse+re-serialize的完整往返开销
+            _json_loads(post_data)
+
+            # 先写临时文件再原子替换，中途崩溃不会损坏现有配置
+            tmp_file = self.config_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'wb') as f:
+                f.write(post_data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.config_file)
+
+            # 配置已变更，失效缓存的更新器实例
+            self.invalidate_updater()
+
+            self._send_json(200, _SAVE_OK_BODY)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'success': False,
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
     def handle_get_regions(self):
         """获取可用地域列表"""
         try:
-            updater = ExcelPriceUpdater()
-            regions = list(updater.price_columns.keys())
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
-                'regions': regions
-            }, ensure_ascii=False).encode('utf-8'))
+            body = self.get_regions_bytes()
+
+            self._send_json(200, body)
         except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
+    def _publish_output(self, temp_output, original_name, suffix):
+        """
+        把带随机段的临时输出文件改名为对用户可见的文件名
+
+        上传文件落盘时文件名做了唯一化（见_parse_multipart_stream），
+        随机段只用于避免并发上传互相覆盖，不应出现在返回给前端
+        和下载的文件名里。公开名从原始上传文件名推导，
+        上传mydata.xlsx得到的仍是mydata_updated.xlsx
+
+        Args:
+            temp_output: 处理产生的临时输出文件路径
+            original_name: 上传时的原始文件名
+            suffix: 输出文件后缀（如'_updated'）
+
+        Returns:
+            改名后的公开文件路径
+        """
+        src = Path(original_name)
+        public_path = self.temp_dir / f"{src.stem}{suffix}{src.suffix}"
+        os.replace(temp_output, public_path)
+        return public_path
+
     def handle_process_excel(self):
         """处理Excel文件"""
+        temp_input = None
         try:
-            # 获取content-type和boundary
-            content_type = self.headers.get('content-type', '')
-            if not content_type.startswith('multipart/form-data'):
-                raise ValueError('Invalid content type')
-            
-            # 提取boundary
-            boundary = content_type.split('boundary=')[1].strip()
-            
-            # 读取POST数据
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # 解析multipart数据
-            parts = post_data.split(('--' + boundary).encode())
-            
-            file_data = None
-            filename = None
-            regions = None
-            
-            for part in parts:
-                if b'Content-Disposition' in part:
-                    # 解析disposition头
-                    lines = part.split(b'\r\n')
-                    for i, line in enumerate(lines):
-                        if b'Content-Disposition' in line:
-                            disposition = line.decode('utf-8')
-                            
-                            # 提取文件
-                            if 'filename=' in disposition:
-                                filename = disposition.split('filename=')[1].strip('"')
-                                # 文件内容在空行之后
-                                content_start = part.find(b'\r\n\r\n') + 4
-                                content_end = len(part) - 2  # 去掉结尾的\r\n
-                                file_data = part[content_start:content_end]
-                            
-                            # 提取地域信息
-                            elif 'name="regions"' in disposition:
-                                content_start = part.find(b'\r\n\r\n') + 4
-                                content_end = len(part) - 2
-                                regions_str = part[content_start:content_end].decode('utf-8')
-                                regions = json.loads(regions_str)
-            
-            if not file_data or not filename or not regions:
+            # 流式解析multipart数据，文件字段边读边写入临时文件
+            files, fields = self._parse_multipart_stream()
+
+            if not files or 'regions' not in fields:
                 raise ValueError('Missing file or regions data')
-            
-            # 保存上传的文件
-            temp_input = self.temp_dir / filename
-            with open(temp_input, 'wb') as f:
-                f.write(file_data)
-            
+
+            _, filename, temp_input = files[0]
+            regions = _json_loads(fields['regions'])
+
+            if not regions:
+                raise ValueError('Missing file or regions data')
+
             # 处理文件
             print(f"Processing file: {temp_input}")
             print(f"Regions: {regions}")
             
-            updater = ExcelPriceUpdater()
+            updater = self.get_updater()
             success = updater.update_prices(
                 str(temp_input),
                 regions,
@@ -231,17 +448,15 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
             )
             
             output_file = temp_input.parent / f"{temp_input.stem}_updated{temp_input.suffix}"
-            
+
             if success and output_file.exists():
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                output_file = self._publish_output(
+                    output_file, filename, '_updated')
+                self._send_json(200, _json_bytes({
                     'success': True,
                     'output_file': output_file.name,
                     'updated_count': 0  # TODO: 从updater获取实际更新数量
-                }, ensure_ascii=False).encode('utf-8'))
+                }))
                 
                 # 删除输入文件
                 temp_input.unlink()
@@ -250,17 +465,18 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
                 
         except Exception as e:
             print(f"Error processing Excel: {e}")
+            if temp_input is not None:
+                try:
+                    temp_input.unlink()
+                except FileNotFoundError:
+                    pass
             import traceback
             traceback.print_exc()
             
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'success': False,
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
     def handle_download_file(self, filename):
         """下载文件"""
@@ -271,14 +487,33 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
             return
         
         try:
-            self.send_response(200)
-            self.send_header('Content-type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.end_headers()
-            
             with open(file_path, 'rb') as f:
-                self.wfile.write(f.read())
-            
+                size = os.fstat(f.fileno()).st_size
+
+                self.send_response(200)
+                self.send_header('Content-type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+                self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+                self.send_header('Content-Length', str(size))
+                self.end_headers()
+                self.wfile.flush()
+
+                # 零拷贝发送：内核直接将文件页缓存写入socket，
+                # 不经过Python层的read+write拷贝
+                offset = 0
+                try:
+                    while offset < size:
+                        sent = os.sendfile(self.wfile.fileno(), f.fileno(),
+                                           offset, size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                except (AttributeError, OSError):
+                    # 平台不支持sendfile时退回分块拷贝
+                    if offset == 0:
+                        shutil.copyfileobj(f, self.wfile, 1 << 20)
+                    else:
+                        raise
+
             # 删除临时文件
             file_path.unlink()
         except Exception as e:
@@ -287,131 +522,62 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
     
     def handle_upload_ban_data(self):
         """上传封号数据表"""
+        ban_file_path = None
         try:
-            # 获取content-type和boundary
-            content_type = self.headers.get('content-type', '')
-            if not content_type.startswith('multipart/form-data'):
-                raise ValueError('Invalid content type')
-            
-            # 提取boundary
-            boundary = content_type.split('boundary=')[1].strip()
-            
-            # 读取POST数据
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # 解析multipart数据
-            parts = post_data.split(('--' + boundary).encode())
-            
-            file_data = None
-            filename = None
-            
-            for part in parts:
-                if b'Content-Disposition' in part and b'filename=' in part:
-                    # 解析disposition头
-                    lines = part.split(b'\r\n')
-                    for line in lines:
-                        if b'Content-Disposition' in line:
-                            disposition = line.decode('utf-8')
-                            filename = disposition.split('filename=')[1].strip('"')
-                            break
-                    
-                    # 文件内容在空行之后
-                    content_start = part.find(b'\r\n\r\n') + 4
-                    content_end = len(part) - 2
-                    file_data = part[content_start:content_end]
-                    break
-            
-            if not file_data or not filename:
+            # 流式解析multipart数据，封号数据表直接写入临时文件
+            files, _ = self._parse_multipart_stream()
+
+            if not files:
                 raise ValueError('Missing file data')
-            
-            # 保存上传的封号数据表
-            ban_file_path = self.temp_dir / filename
-            with open(ban_file_path, 'wb') as f:
-                f.write(file_data)
-            
+
+            _, filename, ban_file_path = files[0]
+
             # 初始化BrowserID替换器并加载封号数据
             WebAppHandler.browser_id_replacer = BrowserIDReplacer()
             WebAppHandler.browser_id_replacer.load_ban_data(str(ban_file_path))
             
             record_count = len(WebAppHandler.browser_id_replacer.ban_mapping)
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(200, _json_bytes({
                 'success': True,
                 'record_count': record_count,
                 'message': f'封号数据表上传成功，共 {record_count} 条记录'
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
             
             # 删除上传的文件
             ban_file_path.unlink()
             
         except Exception as e:
             print(f"Error uploading ban data: {e}")
+            if ban_file_path is not None:
+                try:
+                    ban_file_path.unlink()
+                except FileNotFoundError:
+                    pass
             import traceback
             traceback.print_exc()
             
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'success': False,
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
     def handle_replace_browserid(self):
         """替换BrowserID"""
+        temp_input = None
         try:
             # 检查是否已上传封号数据表
             if not WebAppHandler.browser_id_replacer:
                 raise ValueError('请先上传封号数据表')
             
-            # 获取content-type和boundary
-            content_type = self.headers.get('content-type', '')
-            if not content_type.startswith('multipart/form-data'):
-                raise ValueError('Invalid content type')
-            
-            # 提取boundary
-            boundary = content_type.split('boundary=')[1].strip()
-            
-            # 读取POST数据
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # 解析multipart数据
-            parts = post_data.split(('--' + boundary).encode())
-            
-            file_data = None
-            filename = None
-            
-            for part in parts:
-                if b'Content-Disposition' in part and b'filename=' in part:
-                    # 解析disposition头
-                    lines = part.split(b'\r\n')
-                    for line in lines:
-                        if b'Content-Disposition' in line:
-                            disposition = line.decode('utf-8')
-                            filename = disposition.split('filename=')[1].strip('"')
-                            break
-                    
-                    # 文件内容在空行之后
-                    content_start = part.find(b'\r\n\r\n') + 4
-                    content_end = len(part) - 2
-                    file_data = part[content_start:content_end]
-                    break
-            
-            if not file_data or not filename:
+            # 流式解析multipart数据，目标文件直接写入临时文件
+            files, _ = self._parse_multipart_stream()
+
+            if not files:
                 raise ValueError('Missing file data')
-            
-            # 保存上传的目标文件
-            temp_input = self.temp_dir / filename
-            with open(temp_input, 'wb') as f:
-                f.write(file_data)
-            
+
+            _, filename, temp_input = files[0]
+
             # 替换BrowserID
             print(f"Replacing BrowserID in file: {temp_input}")
             
@@ -421,19 +587,17 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
             )
             
             output_file = temp_input.parent / f"{temp_input.stem}_replaced{temp_input.suffix}"
-            
+
             if result['success'] and output_file.exists():
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json; charset=utf-8')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                output_file = self._publish_output(
+                    output_file, filename, '_replaced')
+                self._send_json(200, _json_bytes({
                     'success': True,
                     'output_file': output_file.name,
                     'replaced_count': result['replaced_count'],
                     'not_found_count': result['not_found_count'],
                     'total_count': result['total_count']
-                }, ensure_ascii=False).encode('utf-8'))
+                }))
                 
                 # 删除输入文件
                 temp_input.unlink()
@@ -442,75 +606,32 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
                 
         except Exception as e:
             print(f"Error replacing BrowserID: {e}")
+            if temp_input is not None:
+                try:
+                    temp_input.unlink()
+                except FileNotFoundError:
+                    pass
             import traceback
             traceback.print_exc()
             
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'success': False,
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
     def handle_split_excel(self):
         """处理Excel拆分请求"""
+        temp_input_dir = None
         try:
-            # 获取content-type和boundary
-            content_type = self.headers.get('content-type', '')
-            if not content_type.startswith('multipart/form-data'):
-                raise ValueError('Invalid content type')
-            
-            # 提取boundary
-            boundary = content_type.split('boundary=')[1].strip()
-            
-            # 读取POST数据
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # 解析multipart数据
-            parts = post_data.split(('--' + boundary).encode())
-            
-            files_data = []
-            group_size = 20  # 默认值
-            
-            for part in parts:
-                if b'Content-Disposition' in part:
-                    lines = part.split(b'\r\n')
-                    for line in lines:
-                        if b'Content-Disposition' in line:
-                            disposition = line.decode('utf-8')
-                            
-                            # 提取文件
-                            if 'filename=' in disposition:
-                                filename = disposition.split('filename=')[1].strip('"')
-                                content_start = part.find(b'\r\n\r\n') + 4
-                                content_end = len(part) - 2
-                                file_data = part[content_start:content_end]
-                                files_data.append((filename, file_data))
-                            
-                            # 提取分组大小
-                            elif 'name="group_size"' in disposition:
-                                content_start = part.find(b'\r\n\r\n') + 4
-                                content_end = len(part) - 2
-                                group_size = int(part[content_start:content_end].decode('utf-8'))
-            
-            if not files_data:
-                raise ValueError('Missing files data')
-            
-            # 创建临时目录保存上传的文件
-            import tempfile
+            # 创建临时目录，流式解析multipart数据并将文件直接写入其中
             temp_input_dir = Path(tempfile.mkdtemp())
-            
-            # 保存所有上传的文件
-            excel_files = []
-            for filename, file_data in files_data:
-                temp_file = temp_input_dir / filename
-                with open(temp_file, 'wb') as f:
-                    f.write(file_data)
-                excel_files.append(str(temp_file))
-            
+            files, fields = self._parse_multipart_stream(dest_dir=temp_input_dir)
+
+            if not files:
+                raise ValueError('Missing files data')
+
+            group_size = int(fields.get('group_size', b'20').decode('utf-8'))
+
             # 创建临时输出目录
             temp_output_dir = Path(tempfile.mkdtemp())
             
@@ -531,16 +652,12 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
                     for file in temp_output_dir.glob('*.xlsx'):
                         zipf.write(file, file.name)
                 
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json; charset=utf-8')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                self._send_json(200, _json_bytes({
                     'success': True,
                     'output_file': zip_path.name,
                     'total_output': result['total_output'],
                     'browser_id_count': result['browser_id_count']
-                }, ensure_ascii=False).encode('utf-8'))
+                }))
                 
                 # 清理临时目录
                 import shutil
@@ -551,67 +668,29 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
                 
         except Exception as e:
             print(f"Error splitting Excel: {e}")
+            if temp_input_dir is not None:
+                shutil.rmtree(temp_input_dir, ignore_errors=True)
             import traceback
             traceback.print_exc()
             
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'success': False,
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
     def handle_merge_excel(self):
         """处理Excel合并请求"""
+        temp_input_dir = None
         try:
-            # 获取content-type和boundary
-            content_type = self.headers.get('content-type', '')
-            if not content_type.startswith('multipart/form-data'):
-                raise ValueError('Invalid content type')
-            
-            # 提取boundary
-            boundary = content_type.split('boundary=')[1].strip()
-            
-            # 读取POST数据
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            
-            # 解析multipart数据
-            parts = post_data.split(('--' + boundary).encode())
-            
-            files_data = []
-            
-            for part in parts:
-                if b'Content-Disposition' in part and b'filename=' in part:
-                    lines = part.split(b'\r\n')
-                    for line in lines:
-                        if b'Content-Disposition' in line:
-                            disposition = line.decode('utf-8')
-                            filename = disposition.split('filename=')[1].strip('"')
-                            break
-                    
-                    content_start = part.find(b'\r\n\r\n') + 4
-                    content_end = len(part) - 2
-                    file_data = part[content_start:content_end]
-                    files_data.append((filename, file_data))
-            
-            if not files_data:
-                raise ValueError('Missing files data')
-            
-            # 创建临时目录保存上传的文件
-            import tempfile
+            # 创建临时目录，流式解析multipart数据并将文件直接写入其中
             temp_input_dir = Path(tempfile.mkdtemp())
-            
-            # 保存所有上传的文件
-            excel_files = []
-            for filename, file_data in files_data:
-                temp_file = temp_input_dir / filename
-                with open(temp_file, 'wb') as f:
-                    f.write(file_data)
-                excel_files.append(str(temp_file))
-            
+            files, _ = self._parse_multipart_stream(dest_dir=temp_input_dir)
+
+            if not files:
+                raise ValueError('Missing files data')
+
+            excel_files = [str(temp_path) for _, _, temp_path in files]
+
             # 输出文件路径
             output_file = self.temp_dir / f"merged_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
             
@@ -620,16 +699,12 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
             result = splitter.merge_excel_files(excel_files, str(output_file))
             
             if result['success']:
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json; charset=utf-8')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({
+                self._send_json(200, _json_bytes({
                     'success': True,
                     'output_file': output_file.name,
                     'merged_files_count': result['merged_files_count'],
                     'total_rows': result['total_rows']
-                }, ensure_ascii=False).encode('utf-8'))
+                }))
                 
                 # 清理临时目录
                 import shutil
@@ -639,27 +714,70 @@ class WebAppHandler(http.server.SimpleHTTPRequestHandler):
                 
         except Exception as e:
             print(f"Error merging Excel: {e}")
+            if temp_input_dir is not None:
+                shutil.rmtree(temp_input_dir, ignore_errors=True)
             import traceback
             traceback.print_exc()
             
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_json(500, _json_bytes({
                 'success': False,
                 'error': str(e)
-            }, ensure_ascii=False).encode('utf-8'))
+            }))
     
     def log_message(self, format, *args):
         """自定义日志格式"""
         return  # 静默模式
 
 
+class ThreadedWebServer(http.server.ThreadingHTTPServer):
+    """多线程HTTP服务器，慢请求（如大文件上传）不会阻塞其他接口"""
+    daemon_threads = True
+    allow_reuse_address = True
+    # 加大accept队列，容忍浏览器并发突发请求
+    request_queue_size = 128
+
+    def server_bind(self):
+        # SO_REUSEPORT让重启循环不再撞上"Address already in use"
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except (AttributeError, OSError):
+            pass
+        super().server_bind()
+
+
+def _find_free_port(start=8800, count=20):
+    """
+    从start端口起探测第一个可绑定的空闲端口
+
+    先用一次廉价的socket.bind预检，找不到返回None；
+    比构造完整HTTP服务器再捕获OSError重试快得多
+    """
+    for port in range(start, start + count):
+        with socket.socket() as s:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                s.bind(("", port))
+            except OSError:
+                continue
+            return port
+    return None
+
+
 def start_server(port=8800):
     """启动Web服务器"""
+    # 清理上次运行残留的临时文件，并注册退出时清理
+    shutil.rmtree(WebAppHandler.temp_dir, ignore_errors=True)
+    WebAppHandler.temp_dir.mkdir(parents=True, exist_ok=True)
+    atexit.register(shutil.rmtree, WebAppHandler.temp_dir, ignore_errors=True)
+
+    # 预检端口：首选端口被占时顺延到下一个空闲端口
+    free_port = _find_free_port(port)
+    if free_port is not None and free_port != port:
+        print(f"\n⚠️  端口 {port} 已被占用，改用端口 {free_port}")
+        port = free_port
+
     try:
-        with socketserver.TCPServer(("", port), WebAppHandler) as httpd:
+        with ThreadedWebServer(("", port), WebAppHandler) as httpd:
             print("="*60)
             print("Excel价格批量更新系统已启动")
             print("="*60)
@@ -671,16 +789,20 @@ def start_server(port=8800):
             print(f"\n按 Ctrl+C 停止服务器\n")
             print("="*60)
             
-            # 在新线程中打开浏览器
+            # 监听就绪后立即打开浏览器，无需固定等待1秒
+            server_ready = threading.Event()
+
             def open_browser():
-                import time
-                time.sleep(1)
-                webbrowser.open(f'http://localhost:{port}')
-            
+                if server_ready.wait(timeout=5):
+                    webbrowser.open(f'http://localhost:{port}')
+
             threading.Thread(target=open_browser, daemon=True).start()
-            
+
             # 启动服务器
-            httpd.serve_forever()
+            server_ready.set()
+            # 默认poll_interval=0.5秒会让空闲进程每秒被唤醒两次，
+            # 拉长轮询间隔以降低空闲功耗；shutdown()不受影响
+            httpd.serve_forever(poll_interval=60)
     except KeyboardInterrupt:
         print("\n\n服务器已停止")
     except OSError as e:
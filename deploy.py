@@ -8,6 +8,7 @@ Excel价格批量更新工具 部署脚本 - 使用 PyInstaller 打包项目
 使用方法:
     python deploy.py                    # 默认：单文件模式，自动清理
     python deploy.py --keep-temp        # 保留临时文件（build、dist、*.spec）
+    python deploy.py --full-rebuild     # 清空分析缓存，完整重新构建
     python deploy.py --onedir           # 使用目录模式（而非单文件）
     python deploy.py --help             # 显示帮助信息
     python deploy.py --version          # 显示版本信息
@@ -21,28 +22,203 @@ Excel价格批量更新工具 部署脚本 - 使用 PyInstaller 打包项目
     ✅ 完整收集 pandas、openpyxl 等依赖
 """
 
+import hashlib
+import importlib.metadata
+import importlib.util
 import os
 import sys
 import shutil
 import platform
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+# 进程生命周期内不会变的环境信息，导入时取一次即可
+# （platform.system 在部分平台会 fork uname，resolve 要走一串 stat）
+SYSTEM = platform.system()
+SEPARATOR = ";" if SYSTEM == "Windows" else ":"
+PROJECT_ROOT = Path(__file__).parent.resolve()
+
+
+def _link_or_copy(src, dst):
+    """同文件系统上用硬链接代替复制，跨设备时退回真拷贝"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+# ---------------------- USAGE.txt 固定段落 ----------------------
+# 使用说明中的静态内容，导入时驻留一次，构建时直接 writelines 写出
+
+_USAGE_TITLE = """========================================
+Excel价格批量更新工具 使用说明
+========================================
+
+"""
+
+_USAGE_FILES_HEAD = """========================================
+📦 主要文件
+========================================
+
+"""
+
+_USAGE_FILES_REST = """- config_template.json      配置文件模板
+- index.html                Web界面（已内嵌）
+- config_editor.html        配置编辑器（已内嵌）
+- README.md                 详细文档
+- USAGE.txt                 本文件
+
+========================================
+🚀 快速开始
+========================================
+
+方法一：使用启动脚本（推荐）
+"""
+
+_USAGE_START_REST = """
+方法二：命令行启动
+  1. 打开终端/命令提示符
+  2. 进入本目录
+"""
+
+_USAGE_BODY = """
+========================================
+📝 使用步骤
+========================================
+
+1. 启动程序后，浏览器会自动打开
+   访问地址: http://localhost:8800
+
+2. 配置产品价格（第一次使用）
+   - 点击"⚙️ 配置管理"标签
+   - 添加产品和价格规则
+   - 支持固定价格或区间定价
+   - 点击"💾 保存配置"
+
+3. 批量更新Excel价格
+   - 点击"🔄 价格更新"标签
+   - 拖拽或选择Excel文件
+   - 选择要更新的地域（HK/SG/MY等）
+   - 点击"开始处理"
+   - 下载处理后的文件
+
+========================================
+⚙️ 配置说明
+========================================
+
+配置文件格式（config.json）：
+
+{
+  "产品名称": {
+    "hk": [最小价, 最大价, 步长],  // 区间定价
+    "sg": 固定价格,                 // 固定定价
+    "my": [min, max, step]
+  }
+}
+
+示例：
+{
+  "Nike Air Force 1": {
+    "hk": [550, 580, 10],  // HK: 550-580之间，10的倍数
+    "sg": [70, 85, 5],     // SG: 70-85之间，5的倍数
+    "my": [50, 60, 10]     // MY: 50-60之间，10的倍数
+  },
+  "Adidas Samba": {
+    "hk": 450,             // HK: 固定价格450
+    "sg": 60,              // SG: 固定价格60
+    "my": 45               // MY: 固定价格45
+  }
+}
+
+========================================
+📊 Excel文件格式要求
+========================================
+
+必需列：
+  - ProductNameCn  （产品中文名称）
+  - {REGION}Price   （各地域价格列，如 HKPrice, SGPrice）
+
+示例：
+  | ProductNameCn        | HKPrice | SGPrice | MYPrice |
+  |---------------------|---------|---------|---------|
+  | Nike Air Force 1    | 565     | 75      | 55      |
+  | Adidas Samba       | 450     | 60      | 45      |
+
+========================================
+🔍 匹配规则
+========================================
+
+产品名称匹配规则：
+  - 优先匹配最具体的名称
+  - 不区分大小写
+  - 支持部分匹配
+
+示例：
+  配置中有 "samba" 和 "samba og"
+  Excel中 "Adidas Samba OG Triple Black"
+  → 匹配到 "samba og"（更具体）
+
+========================================
+❓ 常见问题
+========================================
+
+Q: 如何添加新地域？
+A: 在配置编辑器中，点击"🌍 添加地域"按钮
+
+Q: 如何修改已有产品价格？
+A: 在配置编辑器中，找到产品并修改价格
+
+Q: 支持哪些地域？
+A: 支持任意地域，常见的有：
+   HK(香港), SG(新加坡), MY(马来西亚), TW(台湾),
+   JP(日本), KR(韩国), ID(印尼), TH(泰国), PH(菲律宾)
+
+Q: 程序无法启动？
+A: 检查端口8800是否被占用，或联系技术支持
+
+Q: 如何批量处理多个文件？
+A: 可以一次选择多个Excel文件进行处理
+
+========================================
+🛠️ 技术支持
+========================================
+
+遇到问题？
+  1. 查看 README.md 获取详细文档
+  2. 检查配置文件格式是否正确
+  3. 查看 USAGE.txt 获取使用说明
+
+========================================"""
+
+
 class ExcelPriceUpdaterBuilder:
     """Excel价格批量更新工具 构建器"""
     
-    def __init__(self, keep_temp=False, onefile=True):
+    def __init__(self, keep_temp=False, onefile=True, full_rebuild=False,
+                 optimize=True, verbose=False):
         """初始化构建器"""
-        self.project_root = Path(__file__).parent.resolve()
-        self.system = platform.system()
-        self.separator = ";" if self.system == "Windows" else ":"
+        self.project_root = PROJECT_ROOT
+        self.system = SYSTEM
+        self.separator = SEPARATOR
         self.build_time = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.app_name = "excel_price_updater"
         self.version = "2.0.0"
         self.entry_point = "app.py"
         self.keep_temp = keep_temp
+        # dist 里的产物随后就会被自动清理，不保留临时文件时
+        # 直接移动（同盘只是一次 rename），省掉上百 MB 的来回拷贝
+        self.move_not_copy = not keep_temp
         self.onefile = onefile
+        self.full_rebuild = full_rebuild
+        self.optimize = optimize
+        # 默认 WARN：Analysis 阶段逐模块的 INFO 输出有几千行，
+        # 同步写控制台（尤其 Windows）本身就是可观的耗时
+        self.pyi_log_level = "INFO" if verbose else "WARN"
+        # 持久化的分析缓存目录：PyInstaller 的模块图和二进制扫描结果
+        # 保存在这里，增量构建时直接复用（这是打包耗时的大头）
+        self.cache_dir = self.project_root / ".pyi_cache"
+        self._cmd_cache = None
 
         # 数据文件与目录
         self.data_includes = [
@@ -52,31 +228,30 @@ class ExcelPriceUpdaterBuilder:
             ("README.md", "."),
         ]
 
-        # 排除模块
-        self.excludes = [
-            "tkinter", "unittest", "test", "matplotlib", "scipy", 
-            "IPython", "jupyter", "pkg_resources"
-        ]
-
-        # 隐藏导入
-        self.hidden_imports = [
-            # 第三方库
-            "pandas", "openpyxl", "numpy", "tqdm",
-            # pandas 依赖
-            "pandas._libs", "pandas._libs.tslibs", "pandas._libs.tslibs.base",
-            "pandas._libs.tslibs.timedeltas", "pandas._libs.tslibs.np_datetime",
-            "pandas._libs.tslibs.nattype", "pandas._libs.tslibs.timestamps",
-            # openpyxl 依赖
-            "openpyxl.cell", "openpyxl.cell.cell", "openpyxl.styles",
-            "openpyxl.worksheet", "openpyxl.worksheet.worksheet",
-            # tqdm 依赖
-            "tqdm.std", "tqdm.utils", "tqdm.auto", "tqdm.gui",
-            # 标准库
-            "json", "re", "random", "pathlib", "http.server",
-            "urllib.parse", "email.parser", "io", "tempfile",
-            # 避免 pkg_resources 相关错误
-            "email", "email.mime", "email.mime.text"
-        ]
+        # 排除模块（dict.fromkeys 去重且保序：重复的
+        # --exclude-module/--hidden-import 会让模块图解析器多跑一遍）
+        self.excludes = tuple(dict.fromkeys([
+            "tkinter", "unittest", "test", "matplotlib", "scipy",
+            "IPython", "jupyter", "pkg_resources",
+            # 依赖库自带的测试/边缘子包，打进去只会拖慢分析和膨胀体积
+            "pandas.tests", "pandas.plotting",
+            "numpy.tests", "numpy.f2py", "numpy.distutils",
+        ]))
+
+        # 隐藏导入：只保留静态分析真正发现不了的动态导入。
+        # 标准库模块和源码里直接 import 的第三方库会被 Analysis
+        # 自动收进来，写在这里只是让模块图解析器白跑一遍
+        self.hidden_imports = tuple(dict.fromkeys([
+            # pandas 的 Excel 引擎按字符串名（engine='openpyxl'）动态加载
+            "openpyxl",
+            "openpyxl.styles",
+            # tqdm.auto 运行时按环境挑选实现
+            "tqdm.auto",
+        ]))
+
+        # 同一模块既隐藏导入又排除属于配置错误，尽早暴露
+        assert not set(self.hidden_imports) & set(self.excludes), \
+            "hidden_imports 与 excludes 存在交集"
 
     # ---------------------- 日志 ----------------------
     def log(self, msg, level="INFO"):
@@ -109,40 +284,60 @@ class ExcelPriceUpdaterBuilder:
             'tqdm': 'tqdm',
         }
         
-        missing_packages = []
+        # 用 find_spec 探测包是否存在：只查导入元数据，不执行包的
+        # __init__（真正 import 一次 pandas 就要几百毫秒）。
+        # 缺失项先攒在 to_install 里，最后合并成一次 pip 调用——
+        # 每次 pip 启动都要付解释器冷启动 + 解析器初始化的开销
+        to_install = []
         for pkg, mod in required_packages.items():
-            try:
-                __import__(mod)
+            if importlib.util.find_spec(mod) is not None:
                 self.log(f"{pkg} 已安装", "SUCCESS")
-            except ImportError:
+            else:
                 self.log(f"{pkg} 缺失", "WARN")
-                missing_packages.append(pkg)
-        
-        # 安装缺失的依赖
-        if missing_packages:
-            self.log(f"正在安装缺失的依赖: {', '.join(missing_packages)}...")
-            subprocess.run(
-                [sys.executable, "-m", "pip", "install"] + missing_packages,
-                check=True
-            )
-            self.log("依赖安装完成", "SUCCESS")
+                to_install.append(pkg)
 
-        # 检查 PyInstaller
+        # 检查 PyInstaller（版本号读安装元数据即可，无需 import）
         try:
-            import PyInstaller
-            self.log(f"PyInstaller 版本: {PyInstaller.__version__}", "SUCCESS")
-        except ImportError:
-            self.log("PyInstaller 未安装，正在安装...", "WARN")
+            pyi_version = importlib.metadata.version("pyinstaller")
+            self.log(f"PyInstaller 版本: {pyi_version}", "SUCCESS")
+        except importlib.metadata.PackageNotFoundError:
+            self.log("PyInstaller 未安装，稍后一并安装", "WARN")
+            to_install.append("pyinstaller")
+
+        # Windows 下固定 pefile 版本：PyInstaller 的二进制依赖扫描
+        # 依赖 pefile，新版本存在严重的性能回退，打包耗时会成倍增加
+        if self.system == "Windows":
+            pinned_pefile = "2023.2.7"
+            try:
+                installed = importlib.metadata.version("pefile")
+            except importlib.metadata.PackageNotFoundError:
+                installed = None
+            if installed != pinned_pefile:
+                self.log(f"固定 pefile 版本为 {pinned_pefile}（加速二进制扫描）")
+                to_install.append(f"pefile=={pinned_pefile}")
+
+        # 所有缺失依赖一次性安装。wheel 缓存固定在项目内的
+        # .pip-cache，CI 按这个路径配置缓存即可让二次安装免下载免编译
+        if to_install:
+            pip_cache = self.project_root / ".pip-cache"
+            pip_cache.mkdir(exist_ok=True)
+            self.log(f"正在安装: {', '.join(to_install)}...")
+            self.log(f"pip 缓存目录: {pip_cache}", "INFO")
             subprocess.run(
-                [sys.executable, "-m", "pip", "install", "pyinstaller"],
+                [sys.executable, "-m", "pip", "install",
+                 "--disable-pip-version-check", "--quiet",
+                 "--cache-dir", str(pip_cache)] + to_install,
                 check=True
             )
-            try:
-                import PyInstaller
-                self.log(f"PyInstaller 安装完成: {PyInstaller.__version__}", "SUCCESS")
-            except ImportError:
-                self.log("PyInstaller 安装失败", "ERROR")
-                sys.exit(1)
+            self.log("依赖安装完成", "SUCCESS")
+
+            if "pyinstaller" in to_install:
+                try:
+                    pyi_version = importlib.metadata.version("pyinstaller")
+                    self.log(f"PyInstaller 安装完成: {pyi_version}", "SUCCESS")
+                except importlib.metadata.PackageNotFoundError:
+                    self.log("PyInstaller 安装失败", "ERROR")
+                    sys.exit(1)
 
         # 检查入口文件
         entry_file = self.project_root / self.entry_point
@@ -163,6 +358,63 @@ class ExcelPriceUpdaterBuilder:
             self.log("所有数据文件检查完成", "SUCCESS")
 
     # ---------------------- 清理旧产物 ----------------------
+    # 这些目录树可能非常大且不含源码，遍历时直接跳过
+    _WALK_PRUNE = {'.git', 'release', 'build', 'dist',
+                   'node_modules', '.venv', '.pyi_cache', '.pip-cache'}
+
+    @staticmethod
+    def _rmtree_inode_sorted(path):
+        """按 inode 升序递归删除目录
+
+        ext4 等文件系统上按目录顺序删除大量小文件会退化成平方级
+        耗时（coreutils 的 rm -r 为此做过同样的 inode 排序修复）；
+        PyInstaller 的 build/ 动辄上万个分析产物，正好踩中这一点。
+        """
+        entries = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    entries.append(
+                        (entry.inode(), entry.path,
+                         entry.is_dir(follow_symlinks=False))
+                    )
+        except FileNotFoundError:
+            return
+        entries.sort()
+        for _, entry_path, is_dir in entries:
+            if is_dir:
+                ExcelPriceUpdaterBuilder._rmtree_inode_sorted(entry_path)
+            else:
+                try:
+                    os.unlink(entry_path)
+                except OSError:
+                    pass
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+    def _iter_pycache_dirs(self, root=None):
+        """用 os.scandir 遍历源码树，产出 __pycache__ 目录路径
+
+        相比 rglob，命中 __pycache__ 或无关大目录（.git、release 等）
+        时立刻停止下探，遍历量只和源码文件数相关。
+        """
+        stack = [str(root or self.project_root)]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                        if entry.name == '__pycache__':
+                            yield entry.path
+                        elif entry.name not in self._WALK_PRUNE:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+
     def clean_build_artifacts(self):
         """清理旧的构建产物"""
         if self.keep_temp:
@@ -170,38 +422,73 @@ class ExcelPriceUpdaterBuilder:
             return
         
         self.log("清理旧构建产物...")
-        artifacts = ['build', 'dist', f'{self.app_name}.spec']
+        # 注意：.pyi_cache 是跨构建的分析缓存，不在清理范围内；
+        # 工作目录（workpath）由 PyInstaller 自己管理——增量构建时
+        # 要保留，--full-rebuild 时 --clean 会清它，这里不再重复扫一遍
+        artifacts = ['dist', f'{self.app_name}.spec']
+
+        if self.full_rebuild and self.cache_dir.exists():
+            self._rmtree_inode_sorted(self.cache_dir)
+            self.log("已清空增量构建缓存 .pyi_cache", "INFO")
         
         cleaned_count = 0
         for artifact in artifacts:
             path = self.project_root / artifact
             if path.exists():
                 if path.is_dir():
-                    shutil.rmtree(path)
+                    self._rmtree_inode_sorted(path)
                 else:
                     path.unlink()
                 cleaned_count += 1
         
         # 清理 __pycache__
         pycache_count = 0
-        for pyc in self.project_root.rglob("__pycache__"):
-            if pyc.is_dir():
-                shutil.rmtree(pyc)
-                pycache_count += 1
+        for pyc in self._iter_pycache_dirs():
+            self._rmtree_inode_sorted(pyc)
+            pycache_count += 1
         
         if cleaned_count > 0 or pycache_count > 0:
             self.log(f"清理完成（{cleaned_count} 个构建文件，{pycache_count} 个缓存目录）", "SUCCESS")
 
     # ---------------------- 构建 PyInstaller 命令 ----------------------
+    def _build_inputs_digest(self):
+        """对影响打包结果的全部输入做摘要，用作 spec 缓存键"""
+        try:
+            entry_mtime = os.stat(self.project_root / self.entry_point).st_mtime_ns
+            deploy_mtime = os.stat(__file__).st_mtime_ns
+        except OSError:
+            entry_mtime = deploy_mtime = 0
+        key = repr((
+            tuple(self.data_includes), tuple(self.excludes),
+            tuple(self.hidden_imports), self.onefile, self.optimize,
+            entry_mtime, deploy_mtime,
+        ))
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
     def build_pyinstaller_command(self):
-        """构建 PyInstaller 打包命令"""
+        """构建 PyInstaller 打包命令（同一实例内只组装一次）"""
+        if self._cmd_cache is not None:
+            return list(self._cmd_cache)
         cmd = [
             "pyinstaller",
             "--noconfirm",
-            "--clean",
-            "--log-level=INFO"
+            f"--log-level={self.pyi_log_level}"
         ]
-        
+
+        # 增量构建：workpath 指向持久缓存目录，复用上次的依赖分析；
+        # --full-rebuild 时才加 --clean 推倒重来
+        cmd.extend(["--workpath", str(self.cache_dir / "build")])
+        if self.full_rebuild:
+            cmd.append("--clean")
+
+        # 字节码优化走 --optimize（PyInstaller 6.6+）：打包进去的模块
+        # 以 -OO 级别编译，去掉 docstring 和 assert，包更小、加载更快。
+        # 注意不能靠设 PYTHONOPTIMIZE 环境变量——优先的进程内调用
+        # 方式下解释器早已启动，该变量不再生效。调试时可用
+        # --no-optimize 关闭
+        if self.optimize:
+            cmd.extend(["--optimize", "2"])
+
         # 单文件或目录模式
         if self.onefile:
             cmd.append("--onefile")
@@ -214,14 +501,25 @@ class ExcelPriceUpdaterBuilder:
         # 添加项目路径
         cmd.extend(["--paths", str(self.project_root)])
         
-        # 禁用 UPX 压缩（避免某些兼容性问题）
-        cmd.append("--noupx")
+        # 检测到 upx 时启用压缩：onefile 每次启动都要把包解到临时目录，
+        # 包越小解压写盘越快；已知不兼容的运行库单独排除
+        upx_path = shutil.which("upx")
+        if upx_path:
+            cmd.extend(["--upx-dir", str(Path(upx_path).parent)])
+            cmd.extend(["--upx-exclude", "vcruntime140.dll"])
+            cmd.extend(["--upx-exclude", "python3*.dll"])
+        else:
+            cmd.append("--noupx")
         
-        # 收集子模块（确保所有依赖都被打包）
-        cmd.extend(["--collect-all", "pandas"])
-        cmd.extend(["--collect-all", "openpyxl"])
-        cmd.extend(["--collect-all", "numpy"])
-        cmd.extend(["--collect-all", "tqdm"])
+        # 定向收集（而非 --collect-all）：只补齐常规导入分析
+        # 发现不了的动态子模块和数据文件，避免把整个库
+        # （含测试、文档数据）都拖进分析图和最终产物
+        cmd.extend(["--collect-submodules", "pandas.io.excel"])
+        cmd.extend(["--collect-submodules", "pandas._libs.tslibs"])
+        cmd.extend(["--collect-data", "openpyxl"])
+        cmd.extend(["--collect-submodules", "openpyxl.cell"])
+        cmd.extend(["--collect-submodules", "openpyxl.worksheet"])
+        # numpy/tqdm 由静态分析 + hidden_imports 覆盖即可
 
         # 添加数据文件
         for src, dst in self.data_includes:
@@ -244,22 +542,66 @@ class ExcelPriceUpdaterBuilder:
 
         # 添加入口文件
         cmd.append(str(self.project_root / self.entry_point))
-        
+
+        self._cmd_cache = tuple(cmd)
         return cmd
 
     # ---------------------- 执行构建 ----------------------
+    @staticmethod
+    def _invoke_pyinstaller(cmd):
+        """调用 PyInstaller，返回退出码
+
+        优先走进程内 API（pyinstaller 命令行只是它的薄封装），
+        省掉一次解释器启动和 PyInstaller 自身的重复导入；
+        当前解释器里没有 PyInstaller 时退回子进程方式。
+        """
+        try:
+            from PyInstaller.__main__ import run as pyi_run
+        except ImportError:
+            return subprocess.run(cmd).returncode
+        try:
+            pyi_run(cmd[1:])
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        return 0
+
     def run_build(self):
         """执行 PyInstaller 打包"""
-        cmd = self.build_pyinstaller_command()
+        # 输入未变时直接用缓存的 .spec 构建，
+        # 跳过命令行展开和 Analysis 重新构造
+        spec_cache = self.cache_dir / f"spec-{self._build_inputs_digest()}.spec"
+        if spec_cache.exists() and not self.full_rebuild:
+            self.log(f"命中 spec 缓存: {spec_cache.name}")
+            cmd = [
+                "pyinstaller", "--noconfirm", f"--log-level={self.pyi_log_level}",
+                "--workpath", str(self.cache_dir / "build"),
+                "--distpath", str(self.project_root / "dist"),
+                str(spec_cache),
+            ]
+        else:
+            cmd = self.build_pyinstaller_command()
+
         self.log(f"执行打包命令...")
         self.log(f"命令: {' '.join(cmd)}", "INFO")
-        
-        result = subprocess.run(cmd)
-        
-        if result.returncode != 0:
+
+        # 字节码优化级别由 build_pyinstaller_command 里的 --optimize 2
+        # 指定（spec 缓存命中时级别已固化在 .spec 中），进程内调用和
+        # 子进程回退两条路径都生效
+        if self.optimize:
+            self.log("已启用字节码优化（--optimize 2）", "INFO")
+
+        returncode = self._invoke_pyinstaller(cmd)
+
+        if returncode != 0:
             self.log("打包失败", "ERROR")
             sys.exit(1)
-        
+
+        # 首次构建成功后把生成的 .spec 归档进缓存，供下次复用
+        generated_spec = self.project_root / f"{self.app_name}.spec"
+        if not spec_cache.exists() and generated_spec.exists():
+            self.cache_dir.mkdir(exist_ok=True)
+            shutil.copy2(generated_spec, spec_cache)
+
         self.log("打包完成", "SUCCESS")
 
     # ---------------------- 创建发布包 ----------------------
@@ -282,35 +624,42 @@ class ExcelPriceUpdaterBuilder:
                 f"{self.app_name}.exe" if self.system == "Windows" else self.app_name
             )
 
-        # 复制可执行文件或目录
+        # 可执行文件、配置模板、HTML 备份和文档统一排进一个复制批次，
+        # 由线程池并发执行（文件复制是 I/O 密集操作，线程可重叠；
+        # 大的 onefile 可执行文件和小文件并行拷，互不等待）
+        copy_jobs = []
         if self.onefile:
             if exe_file.exists():
-                shutil.copy2(exe_file, release_dir)
-                self.log(f"复制可执行文件: {exe_file.name}", "SUCCESS")
+                if self.move_not_copy:
+                    shutil.move(str(exe_file), str(release_dir / exe_file.name))
+                    self.log(f"移动可执行文件: {exe_file.name}", "SUCCESS")
+                else:
+                    copy_jobs.append((exe_file, release_dir / exe_file.name))
+                    self.log(f"复制可执行文件: {exe_file.name}", "SUCCESS")
         else:
             if exe_file.parent.exists():
-                shutil.copytree(exe_file.parent, release_dir / self.app_name)
+                # dist 和 release 通常在同一文件系统，硬链接克隆
+                # 只建目录项不拷字节，上百 MB 的依赖目录瞬间完成
+                shutil.copytree(exe_file.parent, release_dir / self.app_name,
+                                copy_function=_link_or_copy)
                 self.log(f"复制应用目录: {self.app_name}", "SUCCESS")
 
-        # 复制配置文件模板
-        config_src = self.project_root / 'config.json'
-        config_dst = release_dir / 'config_template.json'
-        if config_src.exists():
-            shutil.copy2(config_src, config_dst)
-            self.log("复制配置模板", "SUCCESS")
-
-        # 复制 HTML 文件（作为备份）
-        for html_file in ['index.html', 'config_editor.html']:
-            html_src = self.project_root / html_file
-            if html_src.exists():
-                shutil.copy2(html_src, release_dir / html_file)
-
-        # 复制文档
-        for doc_file in ['README.md', 'requirements.txt']:
-            doc_src = self.project_root / doc_file
-            if doc_src.exists():
-                shutil.copy2(doc_src, release_dir / doc_file)
-                self.log(f"复制文档: {doc_file}", "SUCCESS")
+        planned = [
+            ('config.json', 'config_template.json'),
+            ('index.html', 'index.html'),
+            ('config_editor.html', 'config_editor.html'),
+            ('README.md', 'README.md'),
+            ('requirements.txt', 'requirements.txt'),
+        ]
+        for src_name, dst_name in planned:
+            src = self.project_root / src_name
+            if src.exists():
+                copy_jobs.append((src, release_dir / dst_name))
+
+        if copy_jobs:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                list(pool.map(lambda job: shutil.copy2(*job), copy_jobs))
+            self.log(f"复制附属文件 {len(copy_jobs)} 个", "SUCCESS")
 
         # 生成使用说明
         self._create_usage_guide(release_dir, exe_file.name)
@@ -323,151 +672,28 @@ class ExcelPriceUpdaterBuilder:
 
     # ---------------------- 生成使用说明 ----------------------
     def _create_usage_guide(self, release_dir, exe_name):
-        """生成使用说明文档"""
-        usage_content = f"""
-========================================
-Excel价格批量更新工具 使用说明
-========================================
-
-版本: {self.version}
-系统: {self.system}
-构建时间: {self.build_time}
-
-========================================
-📦 主要文件
-========================================
-
-- {exe_name}                主程序可执行文件
-- config_template.json      配置文件模板
-- index.html                Web界面（已内嵌）
-- config_editor.html        配置编辑器（已内嵌）
-- README.md                 详细文档
-- USAGE.txt                 本文件
-
-========================================
-🚀 快速开始
-========================================
-
-方法一：使用启动脚本（推荐）
-{'  - Windows: 双击 run.bat' if self.system == 'Windows' else '  - Mac/Linux: 双击 run.sh 或在终端运行 ./run.sh'}
-
-方法二：命令行启动
-  1. 打开终端/命令提示符
-  2. 进入本目录
-  3. 运行: ./{exe_name}
-
-========================================
-📝 使用步骤
-========================================
-
-1. 启动程序后，浏览器会自动打开
-   访问地址: http://localhost:8800
-
-2. 配置产品价格（第一次使用）
-   - 点击"⚙️ 配置管理"标签
-   - 添加产品和价格规则
-   - 支持固定价格或区间定价
-   - 点击"💾 保存配置"
-
-3. 批量更新Excel价格
-   - 点击"🔄 价格更新"标签
-   - 拖拽或选择Excel文件
-   - 选择要更新的地域（HK/SG/MY等）
-   - 点击"开始处理"
-   - 下载处理后的文件
-
-========================================
-⚙️ 配置说明
-========================================
-
-配置文件格式（config.json）：
-
-{{
-  "产品名称": {{
-    "hk": [最小价, 最大价, 步长],  // 区间定价
-    "sg": 固定价格,                 // 固定定价
-    "my": [min, max, step]
-  }}
-}}
-
-示例：
-{{
-  "Nike Air Force 1": {{
-    "hk": [550, 580, 10],  // HK: 550-580之间，10的倍数
-    "sg": [70, 85, 5],     // SG: 70-85之间，5的倍数
-    "my": [50, 60, 10]     // MY: 50-60之间，10的倍数
-  }},
-  "Adidas Samba": {{
-    "hk": 450,             // HK: 固定价格450
-    "sg": 60,              // SG: 固定价格60
-    "my": 45               // MY: 固定价格45
-  }}
-}}
-
-========================================
-📊 Excel文件格式要求
-========================================
-
-必需列：
-  - ProductNameCn  （产品中文名称）
-  - {{REGION}}Price   （各地域价格列，如 HKPrice, SGPrice）
-
-示例：
-  | ProductNameCn        | HKPrice | SGPrice | MYPrice |
-  |---------------------|---------|---------|---------|
-  | Nike Air Force 1    | 565     | 75      | 55      |
-  | Adidas Samba       | 450     | 60      | 45      |
-
-========================================
-🔍 匹配规则
-========================================
-
-产品名称匹配规则：
-  - 优先匹配最具体的名称
-  - 不区分大小写
-  - 支持部分匹配
-
-示例：
-  配置中有 "samba" 和 "samba og"
-  Excel中 "Adidas Samba OG Triple Black"
-  → 匹配到 "samba og"（更具体）
-
-========================================
-❓ 常见问题
-========================================
-
-Q: 如何添加新地域？
-A: 在配置编辑器中，点击"🌍 添加地域"按钮
-
-Q: 如何修改已有产品价格？
-A: 在配置编辑器中，找到产品并修改价格
+        """生成使用说明文档
 
-Q: 支持哪些地域？
-A: 支持任意地域，常见的有：
-   HK(香港), SG(新加坡), MY(马来西亚), TW(台湾),
-   JP(日本), KR(韩国), ID(印尼), TH(泰国), PH(菲律宾)
-
-Q: 程序无法启动？
-A: 检查端口8800是否被占用，或联系技术支持
-
-Q: 如何批量处理多个文件？
-A: 可以一次选择多个Excel文件进行处理
-
-========================================
-🛠️ 技术支持
-========================================
-
-遇到问题？
-  1. 查看 README.md 获取详细文档
-  2. 检查配置文件格式是否正确
-  3. 查看 USAGE.txt 获取使用说明
+        固定段落是模块级常量（导入时驻留一次），这里只插入版本号、
+        可执行文件名等少量动态内容，用 writelines 分块写出，
+        不再在每次构建时重新插值整篇 5KB 的 f-string。
+        """
+        chunks = [
+            _USAGE_TITLE,
+            f"版本: {self.version}\n系统: {self.system}\n构建时间: {self.build_time}\n\n",
+            _USAGE_FILES_HEAD,
+            f"- {exe_name}                主程序可执行文件\n",
+            _USAGE_FILES_REST,
+            ('  - Windows: 双击 run.bat' if self.system == 'Windows'
+             else '  - Mac/Linux: 双击 run.sh 或在终端运行 ./run.sh') + '\n',
+            _USAGE_START_REST,
+            f"  3. 运行: ./{exe_name}\n",
+            _USAGE_BODY,
+        ]
 
-========================================
-"""
-        
         with open(release_dir / 'USAGE.txt', 'w', encoding='utf-8') as f:
-            f.write(usage_content.strip())
-        
+            f.writelines(chunks)
+
         self.log("生成使用说明", "SUCCESS")
 
     # ---------------------- 生成启动脚本 ----------------------
@@ -552,7 +778,7 @@ fi
             item_path = self.project_root / item
             if item_path.exists():
                 if item_path.is_dir():
-                    shutil.rmtree(item_path)
+                    self._rmtree_inode_sorted(item_path)
                 else:
                     item_path.unlink()
                 cleaned_count += 1
@@ -560,10 +786,9 @@ fi
         
         # 清理 __pycache__
         pycache_count = 0
-        for pycache in self.project_root.rglob('__pycache__'):
-            if pycache.is_dir():
-                shutil.rmtree(pycache)
-                pycache_count += 1
+        for pycache in self._iter_pycache_dirs():
+            self._rmtree_inode_sorted(pycache)
+            pycache_count += 1
         
         if pycache_count > 0:
             self.log(f"删除 {pycache_count} 个 __pycache__ 目录", "INFO")
@@ -623,14 +848,49 @@ fi
             traceback.print_exc()
             sys.exit(1)
 
+    @staticmethod
+    def _scan_size(path):
+        """递归统计目录字节数（scandir 复用目录项缓存的 stat）"""
+        total = 0
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            total += ExcelPriceUpdaterBuilder._scan_size(entry.path)
+                        else:
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return total
+
     def _get_dir_size(self, path):
-        """计算目录大小（MB）"""
+        """计算目录大小（MB）
+
+        老实现 walk + exists + getsize 每个文件要 3 次 stat；
+        scandir 一次搞定，顶层子目录再用线程池并行统计
+        （stat 是释放 GIL 的系统调用，可以真正并发）。
+        """
         total_size = 0
-        for dirpath, dirnames, filenames in os.walk(path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                if os.path.exists(filepath):
-                    total_size += os.path.getsize(filepath)
+        subdirs = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        else:
+                            total_size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            return 0.0
+
+        if subdirs:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                total_size += sum(pool.map(self._scan_size, subdirs))
         return total_size / (1024 * 1024)
 
 # ---------------------- 主函数 ----------------------
@@ -659,6 +919,21 @@ def main():
         action='store_true',
         help='使用目录模式（默认为单文件模式）'
     )
+    parser.add_argument(
+        '--full-rebuild',
+        action='store_true',
+        help='清空增量构建缓存（.pyi_cache）并完整重新分析依赖'
+    )
+    parser.add_argument(
+        '--no-optimize',
+        action='store_true',
+        help='关闭打包字节码优化（保留 docstring/assert，便于调试）'
+    )
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='显示 PyInstaller 的详细（INFO 级）日志'
+    )
     parser.add_argument(
         '--version',
         action='version',
@@ -669,7 +944,10 @@ def main():
     
     builder = ExcelPriceUpdaterBuilder(
         keep_temp=args.keep_temp,
-        onefile=not args.onedir
+        onefile=not args.onedir,
+        full_rebuild=args.full_rebuild,
+        optimize=not args.no_optimize,
+        verbose=args.verbose
     )
     builder.build()
 
@@ -5,7 +5,11 @@ Excel价格批量更新工具 - 命令行版本
 交互式获取多个Excel文件，通过正则匹配ProductNameCn更新价格
 """
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from modules import BrowserIDReplacer, ExcelPriceUpdater
+from modules.price_updater import process_file
 
 
 def main():
@@ -32,15 +36,34 @@ def main():
         
         success_count = 0
         fail_count = 0
-        
-        for excel_file in excel_files:
-            try:
-                updater.update_prices(excel_file, regions)
-                success_count += 1
-            except (FileNotFoundError, KeyError, ValueError) as e:
-                print(f"\n✗ 处理失败: {excel_file}")
-                print(f"  错误: {e}")
-                fail_count += 1
+
+        if len(excel_files) > 1:
+            # 多文件并行处理：文件之间完全独立，用进程池绕开GIL，
+            # 每个工作进程自行构造更新器（见 process_file）
+            workers = min(len(excel_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(
+                    process_file,
+                    [updater.config_file] * len(excel_files),
+                    excel_files,
+                    [regions] * len(excel_files),
+                )
+                for excel_file, error in results:
+                    if error is None:
+                        success_count += 1
+                    else:
+                        print(f"\n✗ 处理失败: {excel_file}")
+                        print(f"  错误: {error}")
+                        fail_count += 1
+        else:
+            for excel_file in excel_files:
+                try:
+                    updater.update_prices(excel_file, regions)
+                    success_count += 1
+                except (FileNotFoundError, KeyError, ValueError) as e:
+                    print(f"\n✗ 处理失败: {excel_file}")
+                    print(f"  错误: {e}")
+                    fail_count += 1
         
         # 输出统计信息
         print("\n" + "="*60)
@@ -4,19 +4,104 @@
 BrowserID替换器模块
 """
 
+import functools
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 
+from .df_utils import read_excel, shrink_dataframe, write_excel
+
+# 可选依赖：pyarrow，封号表首次加载后缓存为parquet，
+# 后续加载跳过openpyxl的XML解析（列式读取快一个量级）
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PARQUET = True
+except ImportError:
+    _HAS_PARQUET = False
+
+
+def _read_ban_columns(ban_file: str) -> pd.DataFrame:
+    """
+    解析封号表的xlsx
+
+    只解析两列必需列并直接按字符串读入：宽表的无关列不再进
+    内存，后续规整也省掉整列astype。列名对不上时退回整表读取，
+    让上层的缺列检查给出原有的报错信息
+
+    Args:
+        ban_file: 封号数据表文件路径
+
+    Returns:
+        封号数据表DataFrame
+    """
+    try:
+        return read_excel(ban_file, usecols=['封号ID', '新对应ID'],
+                          dtype={'封号ID': 'string', '新对应ID': 'string'})
+    except ValueError:
+        return read_excel(ban_file)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_ban_table_cached(path: str, mtime: float,
+                           size: int) -> pd.DataFrame:
+    """
+    按 (路径, mtime, 大小) 缓存解析好的封号表
+
+    长驻进程（Web服务）里同一张封号表会被反复加载，
+    文件没变时直接复用上次的解析结果，变了则key失配自然重读
+
+    Args:
+        path: 封号数据表绝对路径
+        mtime: 文件修改时间
+        size: 文件大小
+
+    Returns:
+        封号数据表DataFrame
+    """
+    return BrowserIDReplacer._read_ban_table(path)
+
+
+def process_file(excel_file: str, ban_mapping: Dict[str, str],
+                 output_suffix: str = "_replaced",
+                 output_file: Optional[str] = None
+                 ) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """
+    处理单个Excel文件（模块级函数，可被进程池pickle调用）
+
+    封号映射已在主进程解析好，直接随任务分发给各工作进程，
+    不必每个进程重新解析封号表
+
+    Args:
+        excel_file: 待处理的Excel文件路径
+        ban_mapping: 封号ID到新ID的映射字典
+        output_suffix: 输出文件后缀
+        output_file: 指定输出文件路径（为None时按后缀生成）
+
+    Returns:
+        (文件路径, 处理结果, 错误信息)，成功时错误信息为None
+    """
+    replacer = BrowserIDReplacer()
+    replacer.ban_mapping = ban_mapping
+    try:
+        result = replacer.replace_browser_id(excel_file, output_suffix,
+                                             output_file=output_file)
+        return excel_file, result, None
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        return excel_file, None, str(e)
+
 
 class BrowserIDReplacer:
     """BrowserID替换器"""
-    
+
     def __init__(self):
         """初始化BrowserID替换器"""
         self.ban_data = None  # 封号数据表
+        self.ban_mapping = None  # 封号ID到新ID的映射
+        self._ban_mapping_int = None  # 纯整数场景的 int->int 快路径映射
     
     def load_ban_data(self, ban_file: str) -> bool:
         """
@@ -36,7 +121,10 @@ class BrowserIDReplacer:
             raise FileNotFoundError(f"封号数据表文件不存在: {ban_file}")
         
         print(f"\n正在加载封号数据表: {ban_file}")
-        self.ban_data = pd.read_excel(ban_file)
+        stat = os.stat(ban_file)
+        self.ban_data = _load_ban_table_cached(
+            os.path.abspath(ban_file), stat.st_mtime, stat.st_size
+        )
         
         # 检查必需的列是否存在
         required_columns = ['封号ID', '新对应ID']
@@ -48,48 +136,81 @@ class BrowserIDReplacer:
                 f"当前列: {', '.join(self.ban_data.columns)}"
             )
         
-        # 创建封号ID到新ID的映射字典
-        # 先转为字符串，去除可能的空格，处理NaN值
-        ban_ids = []
-        new_ids = []
-        for idx, row in self.ban_data.iterrows():
-            ban_id = row['封号ID']
-            new_id = row['新对应ID']
-            
-            # 跳过NaN值
-            if pd.isna(ban_id) or pd.isna(new_id):
-                continue
-            
-            # 如果是数字，转为整数再转字符串（避免520.0这样的浮点数）
-            if isinstance(ban_id, (int, float)):
-                ban_id = str(int(ban_id))
-            else:
-                ban_id = str(ban_id).strip()
-            
-            if isinstance(new_id, (int, float)):
-                new_id = str(int(new_id))
-            else:
-                new_id = str(new_id).strip()
-            
-            ban_ids.append(ban_id)
-            new_ids.append(new_id)
-        
+        # 创建封号ID到新ID的映射字典：整列向量化规整代替逐行
+        # iterrows——先丢掉任一侧为NaN的行，再统一转字符串、去空格、
+        # 去掉520.0这样的浮点数尾巴，全程都是C层的列操作
+        ban = self.ban_data[['封号ID', '新对应ID']].dropna()
+        ban_ids = (ban['封号ID'].astype(str).str.strip()
+                   .str.replace(r'\.0$', '', regex=True))
+        new_ids = (ban['新对应ID'].astype(str).str.strip()
+                   .str.replace(r'\.0$', '', regex=True))
         self.ban_mapping = dict(zip(ban_ids, new_ids))
-        
+
+        # 整数映射缓存：两侧都是纯数字时预转成 int->int 字典，
+        # 整数列的目标文件可以直连映射，整列字符串化全部省掉。
+        # 任一数字key对应了非数字新ID（如 600 -> x7）时放弃
+        # 快路径，否则整数列会漏掉这类替换
+        num_keys = pd.to_numeric(ban_ids, errors='coerce')
+        num_vals = pd.to_numeric(new_ids, errors='coerce')
+        key_is_int = num_keys.notna() & (num_keys % 1 == 0)
+        val_is_int = num_vals.notna() & (num_vals % 1 == 0)
+        self._ban_mapping_int = None
+        if key_is_int.any() and val_is_int[key_is_int].all():
+            self._ban_mapping_int = dict(zip(
+                num_keys[key_is_int].astype(np.int64),
+                num_vals[key_is_int].astype(np.int64),
+            ))
+
         print(f"✓ 成功加载封号数据表，共 {len(self.ban_mapping)} 条记录")
         print(f"  示例映射（前3条）:")
         for i, (old_id, new_id) in enumerate(list(self.ban_mapping.items())[:3]):
             print(f"    {old_id} -> {new_id}")
         return True
     
-    def replace_browser_id(self, excel_file: str, output_suffix: str = "_replaced") -> Dict:
+    @staticmethod
+    def _read_ban_table(ban_file: str) -> pd.DataFrame:
+        """
+        读取封号数据表
+
+        pyarrow可用时在封号表旁边维护一个同名parquet缓存：
+        缓存不旧于xlsx就直接读缓存，否则解析xlsx后刷新缓存。
+        缓存读写失败一律静默退回xlsx路径
+
+        Args:
+            ban_file: 封号数据表文件路径
+
+        Returns:
+            封号数据表DataFrame
+        """
+        if not _HAS_PARQUET:
+            return _read_ban_columns(ban_file)
+
+        cache = Path(ban_file).with_suffix('.parquet')
+        try:
+            if cache.exists() and \
+                    cache.stat().st_mtime >= os.path.getmtime(ban_file):
+                return pd.read_parquet(cache)
+        except (OSError, ValueError):
+            pass
+
+        df = _read_ban_columns(ban_file)
+        try:
+            df.to_parquet(cache)
+        except (OSError, ValueError):
+            pass
+        return df
+
+    def replace_browser_id(self, excel_file: str,
+                           output_suffix: str = "_replaced",
+                           output_file: Optional[str] = None) -> Dict:
         """
         替换Excel文件中的BrowserID
-        
+
         Args:
             excel_file: Excel文件路径
             output_suffix: 输出文件后缀
-            
+            output_file: 指定输出文件路径（为None时按后缀生成）
+
         Returns:
             处理结果字典，包含成功/失败信息和统计数据
             
@@ -98,15 +219,17 @@ class BrowserIDReplacer:
             KeyError: 必需的列不存在
             ValueError: 数据格式错误
         """
-        if self.ban_data is None:
+        if self.ban_mapping is None:
             raise ValueError("请先加载封号数据表")
         
         if not os.path.exists(excel_file):
             raise FileNotFoundError(f"目标文件不存在: {excel_file}")
         
-        # 读取Excel文件
+        # 读取Excel文件，随手收窄dtype压内存；
+        # BrowserID列要按原dtype参与映射和写回，保持原样
         print(f"\n正在处理: {excel_file}")
-        df = pd.read_excel(excel_file)
+        df = shrink_dataframe(read_excel(excel_file),
+                              exclude=('BrowserID',))
         
         # 检查BrowserID列是否存在
         if 'BrowserID' not in df.columns:
@@ -115,53 +238,82 @@ class BrowserIDReplacer:
                 f"当前列: {', '.join(df.columns)}"
             )
         
-        # 统计信息
-        replaced_count = 0
-        not_found_count = 0
-        replaced_details = []  # 记录替换详情
-        
-        # 遍历每一行，替换BrowserID
-        for idx, row in df.iterrows():
-            original_id = row['BrowserID']
-            
-            # 转换BrowserID为字符串（处理整数/浮点数）
-            if pd.isna(original_id):
-                not_found_count += 1
-                continue
-                
-            if isinstance(original_id, (int, float)):
-                browser_id = str(int(original_id))
-            else:
-                browser_id = str(original_id).strip()
-            
-            # 检查是否在封号列表中
-            if browser_id in self.ban_mapping:
-                new_id = self.ban_mapping[browser_id]
-                
-                # 根据原始列的数据类型来决定新值的类型
-                if isinstance(original_id, (int, np.integer)):
-                    # 如果原始是整数，尝试将新ID也转为整数
-                    try:
-                        df.at[idx, 'BrowserID'] = int(new_id)
-                    except ValueError:
-                        df.at[idx, 'BrowserID'] = new_id
-                elif isinstance(original_id, (float, np.floating)):
-                    # 如果原始是浮点数，尝试将新ID转为浮点数
-                    try:
-                        df.at[idx, 'BrowserID'] = float(new_id)
-                    except ValueError:
-                        df.at[idx, 'BrowserID'] = new_id
-                else:
-                    df.at[idx, 'BrowserID'] = new_id
-                
-                replaced_count += 1
-                replaced_details.append(f"{browser_id} -> {new_id}")
-            else:
-                not_found_count += 1
+        # 向量化替换：整列规整成字符串key（数字去掉520.0式的小数
+        # 尾巴，文本去空白）后一次map命中映射，逐行iterrows与
+        # df.at标量写入（纯Python慢路径，还会反复触发dtype升级）全部消失
+        orig = df['BrowserID']
+        int_mapping = getattr(self, '_ban_mapping_int', None)
+        if int_mapping is not None and pd.api.types.is_integer_dtype(orig):
+            # 整数列配纯整数映射：直连 int->int 字典，
+            # 整列字符串化（astype/strip/去尾巴）全部省掉
+            keys = orig
+            mapping = int_mapping
+        else:
+            keys = (orig.astype(str).str.strip()
+                    .str.replace(r'\.0$', '', regex=True))
+            mapping = self.ban_mapping
+        # 先用isin在C层哈希探测一趟筛出命中行，取值只在命中的
+        # 子集上做——封号名单通常只覆盖一小部分行
+        replaced_mask = keys.isin(mapping)
+        hits = keys[replaced_mask]
+        # 超大映射表时Series.map会先把整个dict建成哈希索引，
+        # 开销随映射表大小走；apply(dict.get)只按命中数付费
+        if len(mapping) > 10_000:
+            mapped_hits = hits.apply(mapping.get)
+        else:
+            mapped_hits = hits.map(mapping)
+
+        replaced_count = int(replaced_mask.sum())
+        not_found_count = len(df) - replaced_count
+        replaced_details = [
+            f"{old} -> {new}"
+            for old, new in zip(hits.head(5), mapped_hits.head(5))
+        ]
+
+        if not replaced_count:
+            # 零命中的文件不值得整表重新序列化：原样复制一份当作
+            # 输出（Web流程按输出文件存在性判断成功），直接返回
+            if output_file is None:
+                output_file = self._get_output_filename(excel_file,
+                                                        output_suffix)
+            shutil.copyfile(excel_file, output_file)
+            print(f"✓ 处理完成（无匹配记录，原样复制）")
+            print(f"  总记录数: {len(df)}")
+            print(f"  替换数: 0")
+            print(f"  未匹配数: {not_found_count}")
+            print(f"✓ 已保存到: {output_file}")
+            return {
+                'success': True,
+                'output_file': output_file,
+                'total_count': len(df),
+                'replaced_count': 0,
+                'not_found_count': not_found_count,
+                'skipped': True
+            }
+
+        new_vals = mapped_hits
+        # 列的dtype只判断一次：原列是数值列就整批把新ID转回
+        # 同类数值；转不动（新ID带字母等）则整列先放宽为object
+        # 再写入字符串，避免逐值触发dtype升级
+        target = None
+        if pd.api.types.is_integer_dtype(orig):
+            target = np.int64
+        elif pd.api.types.is_float_dtype(orig):
+            target = np.float64
+        if target is not None:
+            try:
+                new_vals = new_vals.astype(target)
+            except (ValueError, TypeError):
+                df['BrowserID'] = df['BrowserID'].astype(object)
+                new_vals = new_vals.astype(object)
+        else:
+            new_vals = new_vals.astype(object)
+        df.loc[replaced_mask, 'BrowserID'] = new_vals
         
         # 保存更新后的文件
-        output_file = self._get_output_filename(excel_file, output_suffix)
-        df.to_excel(output_file, index=False, engine='openpyxl')
+        if output_file is None:
+            output_file = self._get_output_filename(excel_file, output_suffix)
+        write_excel(df, output_file)
         
         result = {
             'success': True,
@@ -217,22 +369,56 @@ class BrowserIDReplacer:
         print("开始批量处理文件...")
         print("="*60)
         
-        for excel_file in excel_files:
-            try:
-                result = self.replace_browser_id(excel_file, output_suffix)
-                results['success_files'].append({
-                    'file': excel_file,
-                    'output': result['output_file'],
-                    'replaced_count': result['replaced_count'],
-                    'not_found_count': result['not_found_count']
-                })
-                results['total_replaced'] += result['replaced_count']
-                results['total_not_found'] += result['not_found_count']
-            except (FileNotFoundError, KeyError, ValueError) as e:
-                results['failed_files'].append({
-                    'file': excel_file,
-                    'error': str(e)
-                })
+        # 输出路径提前一次性算好，不在各处理路径里重复构造Path
+        output_paths = [
+            self._get_output_filename(f, output_suffix) for f in excel_files
+        ]
+
+        if len(excel_files) > 1:
+            # 多文件并行处理：文件之间完全独立，用进程池绕开GIL；
+            # 封号表只在主进程解析一次，映射字典随任务分发
+            workers = min(len(excel_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outcomes = pool.map(
+                    process_file,
+                    excel_files,
+                    [self.ban_mapping] * len(excel_files),
+                    [output_suffix] * len(excel_files),
+                    output_paths,
+                )
+                for excel_file, result, error in outcomes:
+                    if error is None:
+                        results['success_files'].append({
+                            'file': excel_file,
+                            'output': result['output_file'],
+                            'replaced_count': result['replaced_count'],
+                            'not_found_count': result['not_found_count']
+                        })
+                        results['total_replaced'] += result['replaced_count']
+                        results['total_not_found'] += result['not_found_count']
+                    else:
+                        results['failed_files'].append({
+                            'file': excel_file,
+                            'error': error
+                        })
+        else:
+            for excel_file, output_path in zip(excel_files, output_paths):
+                try:
+                    result = self.replace_browser_id(excel_file, output_suffix,
+                                                     output_file=output_path)
+                    results['success_files'].append({
+                        'file': excel_file,
+                        'output': result['output_file'],
+                        'replaced_count': result['replaced_count'],
+                        'not_found_count': result['not_found_count']
+                    })
+                    results['total_replaced'] += result['replaced_count']
+                    results['total_not_found'] += result['not_found_count']
+                except (FileNotFoundError, KeyError, ValueError) as e:
+                    results['failed_files'].append({
+                        'file': excel_file,
+                        'error': str(e)
+                    })
         
         results['success'] = True
         return results
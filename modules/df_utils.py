@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DataFrame公共工具模块
+跨模块复用的Excel读写引擎选择、dtype瘦身等辅助函数
+"""
+
+from typing import Iterable
+
+import pandas as pd
+
+# 可选依赖：python-calamine（Rust实现的Excel解析器），
+# 读取速度比默认的openpyxl快一个量级，没装就用默认引擎
+try:
+    import python_calamine  # noqa: F401
+    _HAS_CALAMINE = True
+except ImportError:
+    _HAS_CALAMINE = False
+
+# 可选依赖：xlsxwriter的流式写出比openpyxl默认写入快数倍
+try:
+    import xlsxwriter  # noqa: F401
+    _WRITE_ENGINE = "xlsxwriter"
+except ImportError:
+    _WRITE_ENGINE = "openpyxl"
+
+
+def read_excel(path, **kwargs) -> pd.DataFrame:
+    """读取Excel文件（优先使用calamine引擎）"""
+    if _HAS_CALAMINE:
+        return pd.read_excel(path, engine="calamine", **kwargs)
+    return pd.read_excel(path, **kwargs)
+
+
+def write_excel(df: pd.DataFrame, path) -> None:
+    """写出DataFrame为Excel文件（优先使用xlsxwriter引擎）
+
+    xlsxwriter走constant_memory模式逐行落盘，整本工作簿
+    不在内存里驻留，大表写出的峰值内存和耗时都显著下降
+    """
+    if _WRITE_ENGINE == "xlsxwriter":
+        with pd.ExcelWriter(
+                path, engine="xlsxwriter",
+                engine_kwargs={"options": {"constant_memory": True}}
+        ) as writer:
+            df.to_excel(writer, index=False)
+        return
+    df.to_excel(path, index=False, engine="openpyxl")
+
+
+def shrink_dataframe(df: pd.DataFrame,
+                     exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    收窄DataFrame的dtype以降低内存占用
+
+    read_excel读出来的数值列一律是int64/float64，文本列是object，
+    而表里的ID通常是小整数、产品名高度重复。整数列向下转型为
+    能装下取值范围的最小整型，浮点列转float32，高重复（唯一值
+    占比低于一半）的文本列转category。后续整列扫描因此少走很多
+    字节。exclude里的列保持原样，留给还要参与映射或按原dtype
+    写回的关键列
+
+    Args:
+        df: 待收窄的DataFrame（就地修改并返回）
+        exclude: 不做转换的列名集合
+
+    Returns:
+        收窄后的DataFrame
+    """
+    exclude = set(exclude)
+    n_rows = len(df)
+    for col in df.columns:
+        if col in exclude:
+            continue
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='float')
+        elif series.dtype == object or pd.api.types.is_string_dtype(series):
+            if n_rows and series.nunique(dropna=True) / n_rows < 0.5:
+                df[col] = series.astype('category')
+    return df
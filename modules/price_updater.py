@@ -4,31 +4,157 @@
 Excel价格批量更新模块
 """
 
+import functools
 import os
 import json
 import re
 import glob
-import random
 from pathlib import Path
-from typing import List, Dict, Optional, Union
+from typing import List, Dict, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
+
+from .df_utils import shrink_dataframe
+from .df_utils import read_excel as _read_excel
+from .df_utils import write_excel as _write_excel
+
+# 可选依赖：orjson（C实现的JSON解析器），加快配置加载
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _loads_config(raw: bytes) -> Dict:
+    """解析配置JSON字节串（优先orjson）
+
+    orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，
+    调用方的错误处理两条路径通用
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps_config(config: Dict) -> bytes:
+    """序列化配置为带缩进的UTF-8 JSON字节串（优先orjson）"""
+    if orjson is not None:
+        return orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    return json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+# 可选依赖：pyahocorasick，多关键字单趟扫描自动机
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 用于判断key是否为纯文本（不含正则元字符）
+_META_RE = re.compile(r"[.\\^$*+?{}\[\]|()]")
+
+
+def process_file(config_file: str, excel_file: str, regions: List[str],
+                 output_suffix: str = "_updated") -> Tuple[str, Optional[str]]:
+    """
+    处理单个Excel文件（模块级函数，可被进程池pickle调用）
+
+    每个工作进程独立构造更新器——配置解析的开销相比
+    Excel读写可以忽略，换来各进程互不共享任何状态
+
+    Args:
+        config_file: 配置文件路径
+        excel_file: 待处理的Excel文件路径
+        regions: 需要更新的地域列表
+        output_suffix: 输出文件后缀
+
+    Returns:
+        (文件路径, 错误信息)，成功时错误信息为None
+    """
+    try:
+        updater = ExcelPriceUpdater(config_file)
+        updater.update_prices(excel_file, regions, output_suffix)
+        return excel_file, None
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        return excel_file, str(e)
 
 
 class ExcelPriceUpdater:
     """Excel价格批量更新器"""
     
-    def __init__(self, config_file: str = "config.json"):
+    def __init__(self, config_file: str = "config.json",
+                 seed: Optional[int] = None):
         """
         初始化更新器
-        
+
         Args:
             config_file: 配置文件路径
+            seed: 随机数种子，传入固定值可让生成的价格可复现
         """
+        # 独立的PCG64生成器：批量抽样走C层，且不共享全局随机状态
+        self._rng = np.random.default_rng(seed)
+        # 各地域的 (最小值, 步长, 取值个数) 参数数组缓存，
+        # 由_validate_config/首次使用时填充，热路径零解析零校验
+        self._region_params: Dict[str, tuple] = {}
         self.config_file = config_file
         self.config = self._load_config()
         self.product_column = "ProductNameCn"
         # 自动检测所有地域并生成价格列名映射
         self.price_columns = self._build_price_columns()
+        # 关键字长度降序排好、正则编译好各做一次：
+        # 逐行匹配时每行对每个key都重新compile是纯浪费
+        self._sorted_keys = sorted(self.config.keys(), key=len, reverse=True)
+        self._key_to_idx = {key: i for i, key in enumerate(self._sorted_keys)}
+        # 纯文本key（常态）预先统一成小写并转义，编译时不带IGNORECASE，
+        # 把大小写折叠从正则引擎的每次调用挪到初始化做一次；
+        # 真正的正则key保持原样并保留IGNORECASE
+        self._all_literal = not any(
+            _META_RE.search(key) for key in self._sorted_keys
+        )
+        # key按是否含正则元字符分流：纯文本key（发货配置的常态）
+        # 匹配时用str的in运算符做子串扫描——CPython里是C实现的
+        # 双向子串查找，比进一趟正则引擎快得多；真正的正则key
+        # 才编译进正则引擎。两类key留在同一个长度降序列表里逐个
+        # 尝试，混合配置下"更长的key更优先"的约定依然成立
+        self._key_scan = []
+        regex_keys = []
+        for key in self._sorted_keys:
+            if _META_RE.search(key):
+                regex_keys.append(key)
+                self._key_scan.append(
+                    (None, re.compile(key, re.IGNORECASE), key))
+            else:
+                self._key_scan.append((key.lower(), None, key))
+        # 正则key熔合成一个备选正则做预筛：一次search即可判断
+        # 本行是否命中任何正则key，全都不中时扫描里可跳过全部
+        # 正则条目。只预筛、不采信命中结果——备选正则按最左位置
+        # 优先取命中，直接用会破坏长key优先的约定。个别key自带
+        # 分组等结构导致熔合失败时，_fused_pattern为None，
+        # 正则条目一律逐个尝试
+        self._fused_pattern = None
+        if regex_keys:
+            try:
+                self._fused_pattern = re.compile(
+                    "|".join(f"(?:{key})" for key in regex_keys),
+                    re.IGNORECASE
+                )
+            except re.error:
+                self._fused_pattern = None
+        # 所有key都是纯文本时，改用Aho-Corasick自动机：
+        # 单趟 O(|s|) 扫描同时命中全部关键字，再取最长的那个。
+        # 依赖缺失或某个key真的是正则时，仍走上面的熔合正则
+        self._ac = None
+        if ahocorasick is not None and self._all_literal:
+            self._ac = ahocorasick.Automaton()
+            for key in self._sorted_keys:
+                self._ac.add_word(key.lower(), (len(key), key))
+            self._ac.make_automaton()
+        # 产品名→key 的解析结果做实例级memoize：同一批文件里
+        # 产品名大量重复，跨文件处理时同名只解析一次。
+        # 绑定在实例上，配置重载（新建实例）自然带来新缓存
+        self._match_price_key = functools.lru_cache(maxsize=8192)(
+            self._match_price_key
+        )
     
     def _load_config(self) -> Dict:
         """
@@ -56,17 +182,17 @@ class ExcelPriceUpdater:
                 }
             }
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, indent=2, ensure_ascii=False)
-            
+            with open(self.config_file, 'wb') as f:
+                f.write(_dumps_config(default_config))
+
             print(f"✓ 已创建默认配置文件: {self.config_file}")
             print(f"💡 提示：可以使用配置编辑器修改配置: python open_config_editor.py\n")
             
             return default_config
         
-        with open(self.config_file, 'r', encoding='utf-8') as f:
+        with open(self.config_file, 'rb') as f:
             try:
-                config = json.load(f)
+                config = _loads_config(f.read())
             except json.JSONDecodeError as e:
                 raise json.JSONDecodeError(
                     f"配置文件格式错误：{e.msg}\n"
@@ -98,9 +224,9 @@ class ExcelPriceUpdater:
                 }
             }
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, indent=2, ensure_ascii=False)
-            
+            with open(self.config_file, 'wb') as f:
+                f.write(_dumps_config(default_config))
+
             print(f"✓ 已创建默认配置")
             print(f"💡 提示：可以使用配置编辑器修改配置: python open_config_editor.py\n")
             
@@ -143,21 +269,24 @@ class ExcelPriceUpdater:
         """
         return self.price_columns.get(region.lower())
     
-    def _generate_random_price(self, price_config: Union[int, list]) -> int:
+    def _price_params(self, price_config: Union[int, list]) -> Tuple[int, int, int]:
         """
-        生成随机价格
-        
+        解析价格配置为 (最小值, 步长, 取值个数) 三元组
+
+        固定价格表示为取值个数为1的退化区间，
+        统一成 价格 = 最小值 + 随机索引 × 步长 的形式，方便批量生成
+
         Args:
             price_config: 价格配置，可以是固定价格（int）或价格区间（list）
                         区间格式: [最小值, 最大值, 步长]
-            
+
         Returns:
-            生成的价格
+            (最小值, 步长, 取值个数)
         """
         # 如果是固定价格
         if isinstance(price_config, (int, float)):
-            return int(price_config)
-        
+            return int(price_config), 0, 1
+
         # 如果是价格区间
         if isinstance(price_config, list):
             if len(price_config) != 3:
@@ -165,43 +294,52 @@ class ExcelPriceUpdater:
                     f"价格区间配置格式错误：应为 [最小值, 最大值, 步长]，"
                     f"但得到 {price_config}"
                 )
-            
+
             min_price, max_price, step = price_config
             min_price = int(min_price)
             max_price = int(max_price)
             step = int(step)
-            
+
             if min_price > max_price:
                 raise ValueError(
                     f"价格区间配置错误：最小值 {min_price} 大于最大值 {max_price}"
                 )
-            
+
             if step <= 0:
                 raise ValueError(
                     f"价格区间配置错误：步长 {step} 必须大于0"
                 )
-            
+
             # 验证最小值和步长的关系
             if min_price % step != 0:
                 raise ValueError(
                     f"价格区间配置错误：最小值 {min_price} 必须是步长 {step} 的倍数"
                 )
-            
+
             # 计算可能的取值数量
             num_values = (max_price - min_price) // step + 1
-            
-            # 生成随机索引
-            random_index = random.randint(0, num_values - 1)
-            
-            # 生成随机价格
-            random_price = min_price + random_index * step
-            
-            return random_price
-        
+
+            return min_price, step, num_values
+
         raise ValueError(
             f"价格配置格式错误：应为固定价格（数字）或价格区间（[最小值, 最大值, 步长]），"
             f"但得到 {type(price_config)}: {price_config}"
         )
+
+    def _generate_random_price(self, price_config: Union[int, list]) -> int:
+        """
+        生成单个随机价格（批量路径见 update_prices 的向量化生成）
+
+        Args:
+            price_config: 价格配置，可以是固定价格（int）或价格区间（list）
+
+        Returns:
+            生成的价格
+        """
+        min_price, step, num_values = self._price_params(price_config)
+        if num_values == 1:
+            return min_price
+        return min_price + int(self._rng.integers(0, num_values)) * step
     
     def _match_price_key(self, product_name: str) -> Optional[str]:
         """
@@ -214,22 +352,45 @@ class ExcelPriceUpdater:
         Returns:
             匹配到的配置key，如果未匹配到返回None
         """
-        if not product_name or pd.isna(product_name):
+        # 调用方已把整列规整成str，这里不再为每行付pd.isna的
+        # 类型嗅探开销；空值规整后是空串，直接短路
+        if not product_name:
             return None
-        
+
         product_name_str = str(product_name)
-        
-        # 按关键字长度降序排序，优先匹配更具体（更长）的关键字
-        # 这样"samba a"会优先于"samba"匹配
-        sorted_keys = sorted(self.config.keys(), key=len, reverse=True)
-        
-        # 遍历配置文件中的所有key，尝试匹配
-        for key in sorted_keys:
-            # 使用正则匹配，支持大小写不敏感
-            pattern = re.compile(key, re.IGNORECASE)
-            if pattern.search(product_name_str):
-                return key
-        
+        # 纯文本key场景下输入只小写这一次，后续匹配不再做大小写折叠
+        if self._all_literal:
+            product_name_str = product_name_str.lower()
+
+        # Aho-Corasick可用时单趟扫描，取最长命中
+        if self._ac is not None:
+            hits = [val for _, val in self._ac.iter(product_name_str)]
+            if not hits:
+                return None
+            return max(hits)[1]
+
+        # 统一按key长度降序逐个尝试：纯文本key小写后用in做
+        # C级子串扫描，正则key走预编译的pattern，优先命中更具体
+        # （更长）的关键字，"samba a"会优先于"samba"
+        s_low = (product_name_str if self._all_literal
+                 else product_name_str.lower())
+        # 熔合正则只做预筛：本行不含任何正则key时跳过全部正则条目。
+        # 懒求值——可能在碰到第一个正则条目前就命中了文本key
+        try_regex = None
+        for needle, pattern, key in self._key_scan:
+            if needle is not None:
+                if needle in s_low:
+                    return key
+            else:
+                if try_regex is None:
+                    try_regex = (
+                        self._fused_pattern is None
+                        or self._fused_pattern.search(product_name_str)
+                        is not None
+                    )
+                if try_regex and pattern.search(product_name_str):
+                    return key
+
         return None
     
     def _validate_config(self, regions: List[str]) -> None:
@@ -262,13 +423,51 @@ class ExcelPriceUpdater:
             # 验证价格配置格式
             for region in regions:
                 price_config = product_config[region]
-                # 尝试生成价格以验证配置格式
+                # 尝试解析价格参数以验证配置格式
                 try:
-                    self._generate_random_price(price_config)
+                    self._price_params(price_config)
                 except ValueError as e:
                     raise ValueError(
                         f"产品 '{product_key}' 的地域 '{region}' 价格配置错误: {e}"
                     )
+
+        # 校验通过后顺手把各地域的参数数组算好缓存起来，
+        # update_prices 的热路径不再重复解析和isinstance分支
+        for region in regions:
+            self._get_region_param_arrays(region)
+
+    def _get_region_param_arrays(self, region: str) -> tuple:
+        """
+        获取某地域按key索引排列的 (最小值, 步长, 取值个数) 数组
+
+        结果按地域缓存，配置在实例生命周期内不变
+
+        Args:
+            region: 地域代码
+
+        Returns:
+            (mins, steps, nvals) 三个numpy数组
+        """
+        cached = self._region_params.get(region)
+        if cached is None:
+            # 配置里允许个别产品缺某些地域：缺失的条目放占位参数，
+            # 真正命中这些key时由update_prices先行报错，占位值不会被取用
+            params = []
+            for key in self._sorted_keys:
+                product_config = self.config[key]
+                region_config = (product_config.get(region)
+                                 if isinstance(product_config, dict) else None)
+                if region_config is None:
+                    params.append((0, 0, 1))
+                else:
+                    params.append(self._price_params(region_config))
+            cached = (
+                np.array([p[0] for p in params], dtype=np.int64),
+                np.array([p[1] for p in params], dtype=np.int64),
+                np.array([p[2] for p in params], dtype=np.int64),
+            )
+            self._region_params[region] = cached
+        return cached
     
     def update_prices(self, excel_file: str, regions: List[str], 
                      output_suffix: str = "_updated") -> bool:
@@ -291,9 +490,11 @@ class ExcelPriceUpdater:
         if not os.path.exists(excel_file):
             raise FileNotFoundError(f"文件不存在: {excel_file}")
         
-        # 读取Excel文件
+        # 读取Excel文件，随手收窄dtype压内存；
+        # 产品名列后面还要fillna规整，保持原样
         print(f"\n正在处理: {excel_file}")
-        df = pd.read_excel(excel_file)
+        df = shrink_dataframe(_read_excel(excel_file),
+                              exclude=(self.product_column,))
         
         # 检查必需的列是否存在
         if self.product_column not in df.columns:
@@ -313,47 +514,97 @@ class ExcelPriceUpdater:
                 f"Excel文件缺少必需的价格列: {', '.join(missing_price_columns)}"
             )
         
-        # 统计信息
-        updated_count = 0
-        not_found_products = []
-        
-        # 遍历每一行，更新价格
-        for idx, row in df.iterrows():
-            product_name = row[self.product_column]
-            matched_key = self._match_price_key(product_name)
-            
-            if matched_key:
-                # 找到匹配的配置，更新价格
-                for region in regions:
-                    price_col = self._get_region_price(region)
-                    price_config = self.config[matched_key][region]
-                    # 生成随机价格（如果配置是区间）或使用固定价格
-                    price = self._generate_random_price(price_config)
-                    df.at[idx, price_col] = price
-                updated_count += 1
-            else:
-                # 记录未匹配到的产品
-                not_found_products.append(str(product_name))
-        
+        # 向量化匹配：同名产品只解析一次key，再map回整列，
+        # 逐行iterrows和df.at标量写入（两者都是纯Python慢路径）全部消失。
+        # 整列先规整成str（缺失值归为空串），匹配函数里不再做空值嗅探
+        names = df[self.product_column].fillna('').astype(str)
+        key_by_name = {
+            name: self._match_price_key(name) for name in names.unique()
+        }
+        matched_keys = names.map(key_by_name)
+
         # 如果有没有匹配到的产品，报错
-        if not_found_products:
-            unique_not_found = list(set(not_found_products))
+        unmatched_mask = matched_keys.isna()
+        if unmatched_mask.any():
+            unique_not_found = [str(n) for n in names[unmatched_mask].unique()]
             raise ValueError(
                 f"无法匹配以下产品的价格配置:\n" +
                 "\n".join(f"  - {product}" for product in unique_not_found[:10]) +
-                (f"\n  ... 还有 {len(unique_not_found) - 10} 个产品未显示" 
+                (f"\n  ... 还有 {len(unique_not_found) - 10} 个产品未显示"
                  if len(unique_not_found) > 10 else "") +
                 f"\n\n请检查配置文件，补充这些产品的价格配置。"
             )
-        
-        # 保存更新后的文件
+
+        # web路径不经过_validate_config，这里只校验本文件实际命中的
+        # key：配置里其它产品缺某个地域不影响当前文件的处理
+        for key in matched_keys.unique():
+            product_config = self.config[key]
+            missing = [r for r in regions
+                       if not isinstance(product_config, dict)
+                       or r not in product_config]
+            if missing:
+                raise ValueError(
+                    f"产品 '{key}' 缺少以下地域的价格配置: {', '.join(missing)}"
+                )
+
+        # 按地域批量生成随机价：把每个key的 (最小值, 步长, 取值个数)
+        # 排成数组后按行索引gather，一次rng调用生成整列，
+        # 每行仍独立取随机价，只是随机数在C层批量产生
+        idx_arr = matched_keys.map(self._key_to_idx).to_numpy(dtype=np.intp)
+        price_vectors = {}
+        for region in regions:
+            price_col = self._get_region_price(region)
+            mins, steps, nvals = self._get_region_param_arrays(region)
+            rand = self._rng.integers(0, nvals[idx_arr])
+            price_vectors[price_col] = mins[idx_arr] + rand * steps[idx_arr]
+        updated_count = len(df)
+        
+        # 保存更新后的文件：优先在原工作簿上只改价格单元格，
+        # 保留样式、公式和其他工作表；结构不符合预期时
+        # 退回经典的整表重写
         output_file = self._get_output_filename(excel_file, output_suffix)
-        df.to_excel(output_file, index=False, engine='openpyxl')
+        try:
+            self._patch_prices_inplace(excel_file, output_file, price_vectors)
+        except (ValueError, KeyError, OSError):
+            # 多地域的价格列一次assign全部接上，块管理器只整理一次，
+            # 避免逐列赋值时反复的块拆分与合并
+            _write_excel(df.assign(**price_vectors), output_file)
         print(f"✓ 成功更新 {updated_count} 条记录")
         print(f"✓ 已保存到: {output_file}")
         
         return True
     
+    def _patch_prices_inplace(self, excel_file: str, output_file: str,
+                              price_vectors: Dict[str, np.ndarray]) -> None:
+        """
+        在原工作簿上只更新价格单元格后另存
+
+        相比 DataFrame 整表重写，这种方式保留了原有的单元格样式、
+        公式和其他工作表，写出的字节量也只和改动的列相关
+
+        Args:
+            excel_file: 原始Excel文件路径
+            output_file: 输出文件路径
+            price_vectors: 价格列名到整列价格数组的映射
+
+        Raises:
+            ValueError: 工作表结构和读取到的数据对不上
+        """
+        wb = load_workbook(excel_file)
+        ws = wb.active
+
+        header = {cell.value: cell.column for cell in ws[1]}
+        n_rows = next(iter(price_vectors.values())).shape[0]
+        if self.product_column not in header or ws.max_row - 1 != n_rows:
+            raise ValueError("工作表结构与数据不一致，退回整表重写")
+
+        for price_col, prices in price_vectors.items():
+            col_idx = header[price_col]
+            for offset, price in enumerate(prices.tolist(), start=2):
+                ws.cell(row=offset, column=col_idx).value = price
+
+        wb.save(output_file)
+
     def _get_output_filename(self, filepath: str, suffix: str) -> str:
         """
         生成输出文件名
@@ -388,20 +639,23 @@ class ExcelPriceUpdater:
             if not file_path:
                 break
             
-            # 支持通配符
+            # 支持通配符（iglob惰性迭代，**递归模式不会先攒一个大列表）
             if '*' in file_path or '?' in file_path:
-                matched_files = glob.glob(file_path)
-                if matched_files:
-                    files.extend(matched_files)
-                    print(f"找到 {len(matched_files)} 个文件")
+                matched_count = 0
+                for matched in glob.iglob(file_path, recursive=True):
+                    files.append(matched)
+                    matched_count += 1
+                if matched_count:
+                    print(f"找到 {matched_count} 个文件")
                 else:
                     print(f"未找到匹配的文件: {file_path}")
             else:
-                if os.path.exists(file_path):
-                    if os.path.isfile(file_path):
-                        files.append(file_path)
-                    else:
-                        print(f"不是文件: {file_path}")
+                # is_file一次stat同时回答"存在"和"是文件"两个问题
+                path = Path(file_path)
+                if path.is_file():
+                    files.append(file_path)
+                elif path.exists():
+                    print(f"不是文件: {file_path}")
                 else:
                     print(f"文件不存在: {file_path}")
         
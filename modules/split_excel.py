@@ -6,14 +6,16 @@ Excel拆分/合并模块
 """
 
 import os
-from glob import glob
 from pathlib import Path
 from typing import List, Dict, Optional
 import pandas as pd
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed)
 from datetime import datetime
 
+from .df_utils import read_excel, write_excel
+
 
 class ExcelSplitter:
     """Excel拆分/合并工具类"""
@@ -49,15 +51,14 @@ class ExcelSplitter:
             self.log(f"路径不是目录: {root_folder}", "ERROR")
             return []
         
-        # 搜集所有 .xlsx 和 .xls 文件
-        xlsx_files = glob(os.path.join(root_folder, "**/*.xlsx"), recursive=True)
-        xls_files = glob(os.path.join(root_folder, "**/*.xls"), recursive=True)
-        excel_files = xlsx_files + xls_files
-        
-        # 过滤掉临时文件（以 ~$ 开头）
-        excel_files = [f for f in excel_files if not os.path.basename(f).startswith('~$')]
-        
-        self.log(f"共检测到 {len(excel_files)} 个 Excel 文件 (.xlsx: {len(xlsx_files)}, .xls: {len(xls_files)})")
+        # 单趟scandir递归搜集 .xlsx 和 .xls 文件：目录项的类型
+        # 信息直接来自readdir，免去两次glob全树遍历和逐文件stat；
+        # 临时文件（以 ~$ 开头）在枚举时就跳过
+        excel_files = sorted(self._iter_excels(root_folder))
+        xlsx_count = sum(1 for f in excel_files if f.endswith('.xlsx'))
+        xls_count = len(excel_files) - xlsx_count
+
+        self.log(f"共检测到 {len(excel_files)} 个 Excel 文件 (.xlsx: {xlsx_count}, .xls: {xls_count})")
         
         if excel_files:
             self.log("找到的文件列表:")
@@ -67,6 +68,31 @@ class ExcelSplitter:
         
         return excel_files
     
+    @staticmethod
+    def _iter_excels(root_folder: str):
+        """
+        单趟递归枚举目录下的Excel文件路径
+
+        Args:
+            root_folder: 根目录路径
+
+        Yields:
+            Excel文件路径
+        """
+        stack = [root_folder]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.endswith(('.xlsx', '.xls')) \
+                                and not entry.name.startswith('~$'):
+                            yield entry.path
+            except OSError:
+                continue
+
     def split_excel(self, file_path: str, group_size: int) -> Optional[pd.DataFrame]:
         """
         读取 Excel 文件并添加来源信息
@@ -79,8 +105,8 @@ class ExcelSplitter:
             包含来源信息的DataFrame，如果失败返回None
         """
         try:
-            # 读取 Excel 文件
-            df = pd.read_excel(file_path)
+            # 读取 Excel 文件（calamine可用时走快速引擎）
+            df = read_excel(file_path)
             
             # 检查是否为空
             if df.empty:
@@ -138,7 +164,16 @@ class ExcelSplitter:
         success_count = 0
         failed_count = 0
 
-        with ThreadPoolExecutor(max_workers=4) as executor:
+        # 文件多时换进程池：openpyxl解析是持有GIL的纯Python计算，
+        # 线程只能重叠I/O；小批量仍用线程，省掉进程启动开销
+        if len(excel_files) > 4:
+            executor_cls = ProcessPoolExecutor
+            max_workers = min(len(excel_files), os.cpu_count() or 1)
+        else:
+            executor_cls = ThreadPoolExecutor
+            max_workers = 4
+
+        with executor_cls(max_workers=max_workers) as executor:
             futures = {executor.submit(self.split_excel, f, group_size): f for f in excel_files}
             for future in tqdm(as_completed(futures), total=len(futures), desc="加载文件", unit="个"):
                 file_path = futures[future]
@@ -197,54 +232,59 @@ class ExcelSplitter:
             self.log("数据中没有 BrowserID 列", "ERROR")
             return {'success': False, 'error': '数据中没有 BrowserID 列'}
         
-        # 按 BrowserID 分组
-        browser_groups = {}
-        for browser_id, group_df in combined_df.groupby('BrowserID'):
-            browser_groups[browser_id] = group_df.reset_index(drop=True)
-        
-        self.log(f"共发现 {len(browser_groups)} 个不同的 BrowserID:")
-        for browser_id, group_df in browser_groups.items():
-            self.log(f"  - BrowserID {browser_id}: {len(group_df)} 行数据")
-        
+        # 按 BrowserID 统计分组规模（日志与文件数计算用，
+        # 不再把每个分组物化成单独的DataFrame）
+        group_sizes = combined_df.groupby('BrowserID').size()
+        self.log(f"共发现 {len(group_sizes)} 个不同的 BrowserID:")
+        for browser_id, n_rows in group_sizes.items():
+            self.log(f"  - BrowserID {browser_id}: {n_rows} 行数据")
+
         # 计算需要生成的文件数（取最大值）
-        max_rows = max(len(df) for df in browser_groups.values())
+        max_rows = int(group_sizes.max())
         num_files = min(max_rows, group_size)
-        
+        browser_id_count = len(group_sizes)
+
         self.log(f"将生成 {num_files} 个输出文件（分组大小: {group_size}）")
-        
+
         total_output = 0
         failed_output = 0
-        
-        # 生成每个输出文件
-        for file_idx in tqdm(range(num_files), desc="生成文件", unit="个"):
-            try:
-                rows_for_this_file = []
-                
-                # 收集每个 BrowserID 的第 file_idx 行数据
-                for browser_id, group_df in browser_groups.items():
-                    if file_idx < len(group_df):
-                        # 直接使用原始数据，不对齐列结构
-                        row = group_df.iloc[[file_idx]].copy()
-                        rows_for_this_file.append(row)
-                
-                if not rows_for_this_file:
-                    self.log(f"第 {file_idx + 1} 个文件没有数据，跳过", "WARNING")
-                    continue
-                
-                # 合并所有行，保持各自的列结构和列顺序
-                combined = pd.concat(rows_for_this_file, ignore_index=True, sort=False)
-                
-                # 保存文件
-                out_name = f"output_{file_idx + 1:03d}.xlsx"
-                out_path = os.path.join(output_folder, out_name)
-                combined.to_excel(out_path, index=False)
-                total_output += 1
-                
-                self.log(f"  ✓ 生成文件 {out_name}: {len(combined)} 行数据（{len(rows_for_this_file)} 个 BrowserID）")
-                
-            except Exception as e:
-                failed_output += 1
-                self.log(f"保存文件失败 (文件{file_idx+1}): {str(e)}", "ERROR")
+
+        # 一次cumcount给每行标好槽位：同一 BrowserID 的第k行进第k个
+        # 输出文件。旧实现对每个输出文件遍历所有分组做单行切片加
+        # concat（O(文件数×BrowserID数) 次单行拼接），现在一趟
+        # groupby就按槽位切出各输出文件的整块数据
+        slots = combined_df.groupby('BrowserID', sort=False).cumcount()
+        work = combined_df.assign(_slot=slots)
+        work = work[work['_slot'] < num_files]
+        # 槽位内按 BrowserID 排序，输出行序与旧实现一致
+        work = work.sort_values(['_slot', 'BrowserID'], kind='stable')
+
+        def _write_slot(file_idx, slot_df):
+            combined = slot_df.drop(columns='_slot')
+            out_name = f"output_{int(file_idx) + 1:03d}.xlsx"
+            out_path = os.path.join(output_folder, out_name)
+            write_excel(combined, out_path)
+            return out_name, len(combined), combined['BrowserID'].nunique()
+
+        # 输出写盘并行化：XML序列化和zip压缩阶段会释放GIL，
+        # 多个输出文件同时写，保存阶段随核数近线性提速
+        slot_frames = list(work.groupby('_slot', sort=True))
+        workers = min(len(slot_frames), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_write_slot, file_idx, slot_df): file_idx
+                for file_idx, slot_df in slot_frames
+            }
+            for future in tqdm(as_completed(futures), total=len(futures),
+                               desc="生成文件", unit="个"):
+                file_idx = futures[future]
+                try:
+                    out_name, n_rows, n_ids = future.result()
+                    total_output += 1
+                    self.log(f"  ✓ 生成文件 {out_name}: {n_rows} 行数据（{n_ids} 个 BrowserID）")
+                except Exception as e:
+                    failed_output += 1
+                    self.log(f"保存文件失败 (文件{int(file_idx)+1}): {str(e)}", "ERROR")
         
         self.log(f"✅ 处理完成:")
         self.log(f"  - 成功输出: {total_output} 个文件")
@@ -255,7 +295,7 @@ class ExcelSplitter:
             'success': True,
             'total_output': total_output,
             'failed_output': failed_output,
-            'browser_id_count': len(browser_groups)
+            'browser_id_count': browser_id_count
         }
     
     def merge_excel_files(self, excel_files: List[str], output_path: str) -> Dict:
@@ -284,7 +324,7 @@ class ExcelSplitter:
                 self.log(f"正在读取文件 {i}/{len(excel_files)}: {os.path.basename(file_path)}")
                 
                 try:
-                    df = pd.read_excel(file_path)
+                    df = read_excel(file_path)
                     if not df.empty:
                         # 添加来源文件列
                         df['SourceFile'] = os.path.basename(file_path)
@@ -301,29 +341,32 @@ class ExcelSplitter:
                 self.log("没有有效的数据可以合并", "ERROR")
                 return {'success': False, 'error': '没有有效的数据可以合并'}
             
-            # 合并所有数据
-            self.log(f"开始合并 {len(all_data)} 个文件的数据...")
+            # 合并所有数据；合并完随手释放各文件的单独DataFrame，
+            # 写出阶段只驻留合并后的一份数据
+            merged_count = len(all_data)
+            self.log(f"开始合并 {merged_count} 个文件的数据...")
             merged_df = pd.concat(all_data, ignore_index=True)
-            
+            all_data.clear()
+
             # 重新排列列，将来源信息放在最后
             cols = list(merged_df.columns)
             source_cols = ['SourceFile', 'SourceFolder']
             other_cols = [col for col in cols if col not in source_cols]
             final_cols = other_cols + source_cols
             merged_df = merged_df[final_cols]
-            
-            # 保存合并后的文件
+
+            # 保存合并后的文件（xlsxwriter可用时逐行流式落盘）
             self.log(f"正在保存合并文件: {output_path}")
-            merged_df.to_excel(output_path, index=False)
-            
+            write_excel(merged_df, output_path)
+
             self.log(f"✅ 合并完成!")
-            self.log(f"  - 合并文件数: {len(all_data)}")
+            self.log(f"  - 合并文件数: {merged_count}")
             self.log(f"  - 总行数: {total_rows}")
             self.log(f"  - 输出文件: {output_path}")
             
             return {
                 'success': True,
-                'merged_files_count': len(all_data),
+                'merged_files_count': merged_count,
                 'total_rows': total_rows,
                 'output_file': output_path
             }